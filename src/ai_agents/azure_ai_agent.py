@@ -5,20 +5,176 @@ This module implements a flexible AI agent that uses Azure AI Foundry Agent Serv
 to orchestrate purchase order workflows using native MCP tools support.
 """
 
+import asyncio
+import json
 import logging
 import os
+import re
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Callable, Deque, Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import urlparse
 
 from dotenv import load_dotenv
-from azure.ai.projects import AIProjectClient
-from azure.identity import DefaultAzureCredential
-from azure.ai.agents.models import McpTool
+from azure.ai.projects.aio import AIProjectClient
+from azure.identity.aio import DefaultAzureCredential
+from azure.ai.agents.models import (
+    FunctionTool,
+    ListSortOrder,
+    McpTool,
+    MessageRole,
+    RunStatus,
+    SubmitToolOutputsAction,
+    ThreadMessageOptions,
+    ThreadRun,
+    ToolOutput,
+    TruncationObject,
+    TruncationStrategy,
+)
+from azure.core.exceptions import ResourceNotFoundError
 
+from mcp_client import FastMCPClient, MCPToolError, ToolResultCache
+from offer_ranking import rank_offer_indices
 
-@dataclass
+
+AGENT_NAME = "purchase-order-agent"
+# Direct-mode agents get their own name and instructions, so agents are never shared
+# between the modes
+DIRECT_AGENT_NAME = "purchase-order-agent-direct"
+
+MCP_TOOL_CACHE_TTL = 300
+# Endpoint paths served by FastMCP; trailing slashes are stripped before matching
+MCP_ENDPOINT_PATHS = ('/sse', '/mcp')
+
+MAX_RUN_SECONDS = 300
+USER_CONTEXT_TTL_SECONDS = 3600
+RUN_POLL_INTERVAL_SECONDS = 1
+# Runs failed by model throttling are retried with exponential backoff
+MAX_RATE_LIMIT_RETRIES = 7
+RATE_LIMIT_BACKOFF_SECONDS = 5
+RATE_LIMIT_BACKOFF_MAX_SECONDS = 60
+# Completion budget for a whole run; a recommendation plus a handful of tool calls
+# fits comfortably, and a lower cap bounds generation latency
+DEFAULT_MAX_COMPLETION_TOKENS = 1024
+
+# Thread messages an MCP-mode run reads. Threads are reused per user, so only the
+# current request is sent; earlier requests and answers would grow the prompt and
+# could bias the recommendation for an unrelated product
+THREAD_HISTORY_MESSAGES = 1
+
+_ACTIVE_RUN_STATUSES = (RunStatus.QUEUED, RunStatus.IN_PROGRESS, RunStatus.REQUIRES_ACTION)
+
+# Audit records created by the agent that are kept in memory; the oldest are dropped
+MAX_AUDIT_RECORDS_IN_MEMORY = 1000
+
+# Limits how many searched products the direct workflow fetches supplier offers for
+MAX_DIRECT_CANDIDATES = 5
+
+DIRECT_MODE_INSTRUCTIONS = """All business data for this request has already been retrieved and is included in the user message as JSON. Do not call any tools; base your recommendation only on the provided data. "ranked_offers" is a deterministic pre-ranking by budget fit and supplier reliability; use it as a starting point, but apply the department's purchase strategy. The audit record is created automatically."""
+
+# Words in free-text requests that never identify a product
+_SEARCH_STOPWORDS = frozenset({
+    "available", "best", "good", "have", "help", "high", "like", "most", "need", "order",
+    "please", "purchase", "really", "request", "some", "team", "that", "their", "this",
+    "want", "with", "work", "would", "your",
+})
+
+# MCP tools the agent may call. The model already receives each tool's schema and
+# description from the server, so the instructions below do not repeat them.
+# create_audit_record runs in-process as a function tool instead.
+MCP_ALLOWED_TOOLS: Tuple[str, ...] = (
+    "get_user",
+    "get_department_policy",
+    "get_department_budget",
+    "search_products",
+    "get_product_details",
+    "get_supplier_info",
+    "batch_execute",
+)
+
+# Kept short and byte-identical across agents: every token here is re-sent on each
+# model turn, and a stable prefix stays eligible for service-side prompt caching
+_AGENT_INSTRUCTIONS = """You process purchase requests: check the user's department policy and budget, find suitable products and suppliers, and recommend what to buy.
+
+Workflow:
+1. get_user for the user's department
+2. One batch_execute with get_department_policy, get_department_budget and search_products
+3. get_product_details and get_supplier_info for the candidates, batching independent calls with batch_execute
+4. Recommend a product and supplier with brief reasoning, or explain why the request cannot be fulfilled
+5. Call create_audit_record
+
+Base decisions only on tool data."""
+
+# MCP tools whose results describe the requesting user rather than the request, so
+# MCP-mode runs can reuse them for the same user's later requests
+_USER_CONTEXT_TOOLS = ("get_user", "get_department_policy")
+
+DEFAULT_MCP_SERVER_URL = "https://mcp.ashystone-fba1adc5.swedencentral.azurecontainerapps.io"
+DEFAULT_MCP_HTTP_SERVER_URL = "http://localhost:8000/mcp/"
+_REQUIRED_ENV_VARS = ("PROJECT_ENDPOINT", "MODEL_DEPLOYMENT_NAME")
+
+# Steps of the request running in the current task, so concurrent requests on one
+# agent instance each collect their own steps
+_REQUEST_STEPS: ContextVar[List["AgentStep"]] = ContextVar("request_steps")
+_STEP_CALLBACK: ContextVar[Optional[Callable[["AgentStep"], None]]] = ContextVar("step_callback", default=None)
+
+# Configured MCP tools keyed by normalized server URL, stored with their creation time
+_MCP_TOOL_CACHE: Dict[str, Tuple[float, McpTool]] = {}
+
+
+@dataclass(frozen=True, slots=True)
+class _AgentConfig:
+    """Validated settings read from the environment."""
+    project_endpoint: str
+    model_deployment_name: str
+    mcp_server_url: str
+    mcp_http_server_url: str
+    agent_id: Optional[str]
+
+
+@lru_cache(maxsize=1)
+def _validated_config(config_path: Path) -> _AgentConfig:
+    """
+    Load the .env file and validate the environment once per config path.
+    
+    Agents constructed repeatedly with the same path reuse the result instead of
+    re-reading the file and probing the environment. Failures are not cached.
+    
+    Args:
+        config_path: Path to the .env file
+        
+    Returns:
+        Validated agent configuration
+        
+    Raises:
+        ValueError: If required environment variables are missing
+    """
+    logger = logging.getLogger(__name__)
+    if config_path.exists():
+        load_dotenv(config_path)
+        logger.info(f"Loaded configuration from {config_path}")
+    else:
+        logger.warning(f"No .env file found at {config_path}, using environment variables")
+    
+    missing_vars = [var for var in _REQUIRED_ENV_VARS if not os.getenv(var)]
+    if missing_vars:
+        raise ValueError(f"Missing required environment variables: {missing_vars}")
+    
+    return _AgentConfig(
+        project_endpoint=os.getenv("PROJECT_ENDPOINT"),
+        model_deployment_name=os.getenv("MODEL_DEPLOYMENT_NAME"),
+        mcp_server_url=os.getenv("MCP_SERVER_URL", DEFAULT_MCP_SERVER_URL),
+        mcp_http_server_url=os.getenv("MCP_HTTP_SERVER_URL", DEFAULT_MCP_HTTP_SERVER_URL),
+        agent_id=os.getenv("AGENT_ID") or None
+    )
+
+
+@dataclass(slots=True)
 class AgentStep:
     """Represents a single step in the agent's execution."""
     step_number: int
@@ -27,14 +183,13 @@ class AgentStep:
     mcp_tool_called: Optional[str] = None
     mcp_tool_params: Optional[Dict[str, Any]] = None
     mcp_result: Optional[str] = None
+    # Where a direct MCP result came from: "server", or "cache" when it was reused
+    mcp_result_source: Optional[str] = None
+    # Wall-clock time of the step; only recorded when debug logging is enabled
     timestamp: Optional[datetime] = None
-    
-    def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = datetime.now()
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentResult:
     """Final result from the Azure AI Agent."""
     success: bool
@@ -50,23 +205,80 @@ class AzureAIFoundryAgent:
     """
     Azure AI Foundry Agent for self-orchestrated purchase order processing.
     
-    Uses Azure AI Foundry Agent Service to create agents with MCP tools
-    and code interpreter capabilities for intelligent order processing.
+    Uses Azure AI Foundry Agent Service to create agents with MCP tools and a local
+    audit function tool for intelligent order processing.
     """
     
-    def __init__(self, config_path: Optional[Path] = None):
+    def __init__(self, config_path: Optional[Path] = None, cache: bool = True,
+                 cache_ttl_seconds: float = MCP_TOOL_CACHE_TTL, max_steps: int = 10,
+                 max_tool_errors: int = 2, max_run_seconds: float = MAX_RUN_SECONDS,
+                 max_cached_threads: int = 32, use_mcp: bool = True,
+                 tool_cache: Optional[ToolResultCache] = None,
+                 max_completion_tokens: Optional[int] = DEFAULT_MAX_COMPLETION_TOKENS,
+                 tool_choice: str = "auto", parallel_tool_calls: bool = True,
+                 user_context_ttl_seconds: float = USER_CONTEXT_TTL_SECONDS,
+                 max_rate_limit_retries: int = MAX_RATE_LIMIT_RETRIES):
         """
         Initialize the Azure AI Foundry Agent.
         
         Args:
             config_path: Path to the .env configuration file
+            cache: Whether to reuse MCP tool configurations across requests
+            cache_ttl_seconds: How long a cached MCP tool stays valid
+            max_steps: Maximum number of function-call rounds per run before it is cancelled
+            max_tool_errors: Number of failed tool calls tolerated before the run is cancelled
+            max_run_seconds: Wall-clock budget for a single run
+            max_cached_threads: Number of per-user conversation threads kept for reuse
+                in MCP mode; 0 creates a new thread for every request. Runs on a reused
+                thread only read the current request. Direct-mode requests always start
+                a new thread.
+            use_mcp: Let the agent orchestrate MCP tools itself. When False, business data
+                is gathered up front with parallel MCP calls and the model answers in a
+                single turn without tools.
+            tool_cache: Cache for the direct MCP calls made when ``use_mcp`` is False.
+                Defaults to a new cache when ``cache`` is enabled, so results are
+                reused by every request on this instance.
+            max_completion_tokens: Completion token budget for a whole run, across all
+                tool-calling turns; None leaves it to the service
+            tool_choice: Tool choice passed to MCP-mode runs
+            parallel_tool_calls: Let the model request independent tool calls in one turn
+            user_context_ttl_seconds: How long the user profile and department policy
+                retrieved by an MCP-mode run are passed to the same user's later
+                requests instead of being looked up again; only used when ``cache``
+                is enabled
+            max_rate_limit_retries: How often a run that failed because the model
+                deployment was rate limited is retried, with exponential backoff
         """
         self.logger = self._setup_logging()
+        self.cache = cache
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.max_steps = max_steps
+        self.max_tool_errors = max_tool_errors
+        self.max_run_seconds = max_run_seconds
+        self.max_cached_threads = max_cached_threads
+        self.use_mcp = use_mcp
+        self.tool_cache = tool_cache if tool_cache is not None else (ToolResultCache() if cache else None)
+        self.max_completion_tokens = max_completion_tokens
+        self.tool_choice = tool_choice
+        self.parallel_tool_calls = parallel_tool_calls
+        self.user_context_ttl_seconds = user_context_ttl_seconds
+        self.max_rate_limit_retries = max_rate_limit_retries
         self._load_config(config_path)
         self.project_client: Optional[AIProjectClient] = None
-        self.agent_id: Optional[str] = None
-        self.execution_steps: List[AgentStep] = []
-        self.step_counter = 0
+        self._credential: Optional[DefaultAzureCredential] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.agent_id: Optional[str] = self._config.agent_id
+        self._agent_ready = False
+        self._owns_agent = False
+        self._agent_lock = asyncio.Lock()
+        # MCP client of the direct workflow, opened once and shared by all requests
+        self._mcp_client: Optional[FastMCPClient] = None
+        self._mcp_lock = asyncio.Lock()
+        self.audit_records: Deque[Dict[str, Any]] = deque(maxlen=MAX_AUDIT_RECORDS_IN_MEMORY)
+        self.audit_tool = FunctionTool({self.create_audit_record})
+        self._thread_cache: "OrderedDict[str, str]" = OrderedDict()
+        # User ID -> (expiry, outputs of the user context tools) captured from MCP-mode runs
+        self._user_context: Dict[str, Tuple[float, Dict[str, Any]]] = {}
         
     def _setup_logging(self) -> logging.Logger:
         """Setup structured logging for the agent."""
@@ -88,50 +300,56 @@ class AzureAIFoundryAgent:
         if config_path is None:
             config_path = Path(__file__).parent / ".env"
         
-        if config_path.exists():
-            load_dotenv(config_path)
-            self.logger.info(f"Loaded configuration from {config_path}")
-        else:
-            self.logger.warning(f"No .env file found at {config_path}, using environment variables")
-        
-        # Validate required environment variables
-        required_vars = [
-            "PROJECT_ENDPOINT",
-            "MODEL_DEPLOYMENT_NAME"
-        ]
-        
-        missing_vars = [var for var in required_vars if not os.getenv(var)]
-        if missing_vars:
-            raise ValueError(f"Missing required environment variables: {missing_vars}")
+        self._config = _validated_config(config_path.resolve())
+        self._endpoint = self._config.project_endpoint
+        self._model = self._config.model_deployment_name
+        self.mcp_http_url = self._config.mcp_http_server_url
     
     def _setup_project_client(self) -> AIProjectClient:
-        """Setup Azure AI Foundry project client."""
+        """Setup Azure AI Foundry project client.
+        
+        The credential lives as long as the client, so the credential chain is probed
+        and tokens are acquired once rather than per request. Async credentials are
+        bound to their event loop, which is why it is not shared module-wide.
+        """
+        self._credential = DefaultAzureCredential(exclude_interactive_browser_credential=True)
         return AIProjectClient(
-            endpoint=os.getenv("PROJECT_ENDPOINT"),
-            credential=DefaultAzureCredential()
+            endpoint=self._endpoint,
+            credential=self._credential
         )
     
     def _add_step(self, action: str, reasoning: str, 
                   mcp_tool_called: Optional[str] = None,
                   mcp_tool_params: Optional[Dict[str, Any]] = None,
-                  mcp_result: Optional[str] = None) -> None:
-        """Add an execution step to the tracking list."""
-        self.step_counter += 1
+                  mcp_result: Optional[str] = None,
+                  mcp_result_source: Optional[str] = None) -> None:
+        """Add an execution step to the current request's tracking list."""
+        steps = _REQUEST_STEPS.get(None)
+        if steps is None:
+            # Outside a request (e.g. client warm-up) the step is only logged
+            steps = []
         step = AgentStep(
-            step_number=self.step_counter,
+            step_number=len(steps) + 1,
             action=action,
             reasoning=reasoning,
             mcp_tool_called=mcp_tool_called,
             mcp_tool_params=mcp_tool_params,
-            mcp_result=mcp_result
+            mcp_result=mcp_result,
+            mcp_result_source=mcp_result_source,
+            timestamp=datetime.now() if self.logger.isEnabledFor(logging.DEBUG) else None
         )
-        self.execution_steps.append(step)
+        steps.append(step)
+        
+        on_step = _STEP_CALLBACK.get()
+        if on_step is not None:
+            on_step(step)
         
-        # Log the step
-        self.logger.info(f"Step {self.step_counter}: {action}")
-        self.logger.debug(f"Reasoning: {reasoning}")
+        # %-style arguments defer formatting (including large tool params) until a
+        # handler actually accepts the record
+        self.logger.info("Step %d: %s", step.step_number, action)
+        self.logger.debug("Reasoning: %s", reasoning)
         if mcp_tool_called:
-            self.logger.debug(f"MCP Tool: {mcp_tool_called}({mcp_tool_params})")
+            self.logger.debug("MCP Tool: %s(%s)", mcp_tool_called, mcp_tool_params)
     
     def _normalize_mcp_url(self, url: str) -> str:
         """Normalize MCP server URL to ensure it has the correct endpoint path.
@@ -142,226 +360,738 @@ class AzureAIFoundryAgent:
         Returns:
             Normalized URL with proper endpoint path for Azure AI Foundry (SSE)
         """
-        from urllib.parse import urlparse
-        
         url = url.rstrip('/')
         
         # If URL already has an MCP endpoint path, use it as-is with trailing slash
-        if url.endswith('/sse') or url.endswith('/mcp'):
+        if url.endswith(MCP_ENDPOINT_PATHS):
             return url + '/'
         
-        # If URL already has the endpoint with trailing slash, return as-is
-        if url.endswith('/sse/') or url.endswith('/mcp/'):
-            return url
-        
         # If URL doesn't have an endpoint path, add SSE for Azure AI Foundry
-        parsed = urlparse(url)
-        if not parsed.path or parsed.path == '/':
+        if not urlparse(url).path:
             return url + '/sse/'
         
-        # If there's some other path, add trailing slash if needed
-        return url + '/' if not url.endswith('/') else url
+        # If there's some other path, add a trailing slash
+        return url + '/'
 
     def _create_mcp_tool(self) -> McpTool:
         """
         Create Azure AI Foundry native MCP tool.
         
+        Tools are cached per server URL for ``cache_ttl_seconds`` when caching is enabled.
+        
         Returns:
             McpTool instance configured for the business data server
         """
-        mcp_url = os.getenv("MCP_SERVER_URL", "https://mcp.ashystone-fba1adc5.swedencentral.azurecontainerapps.io")
-        normalized_url = self._normalize_mcp_url(mcp_url)
+        normalized_url = self._normalize_mcp_url(self._config.mcp_server_url)
+        
+        if self.cache:
+            cached = _MCP_TOOL_CACHE.get(normalized_url)
+            if cached and time.monotonic() - cached[0] < self.cache_ttl_seconds:
+                return cached[1]
         
         # Create MCP tool with native Azure AI Foundry support
         mcp_tool = McpTool(
             server_label="business_data_server",
             server_url=normalized_url,
-            allowed_tools=[]  # Allow all tools by default
+            allowed_tools=list(MCP_ALLOWED_TOOLS)
         )
         
         # Disable approval requirement for automated execution (as shown in docs)
         mcp_tool.set_approval_mode("never")
         
+        if self.cache:
+            _MCP_TOOL_CACHE[normalized_url] = (time.monotonic(), mcp_tool)
+        
         self.logger.info(f"Created MCP tool for server: {normalized_url}")
         return mcp_tool
     
+    def create_audit_record(self, user_id: str, action: str, details: Dict[str, Any],
+                            decision_reasoning: Optional[str] = None) -> str:
+        """
+        Create an audit record for a purchase decision.
+        
+        :param user_id: The user who made the request
+        :param action: The action taken, e.g. purchase_approved or purchase_denied
+        :param details: Additional details about the decision
+        :param decision_reasoning: Optional reasoning for the decision
+        :return: The created audit record as JSON
+        """
+        # The :param format above is what FunctionTool parses into the tool schema
+        record = {
+            "timestamp": datetime.now().isoformat(),
+            "user_id": user_id,
+            "action": action,
+            "details": details,
+            "decision_reasoning": decision_reasoning
+        }
+        self.audit_records.append(record)
+        result = json.dumps(record)
+        
+        self._add_step(
+            action="Create Audit Record",
+            reasoning=f"Recorded '{action}' decision for user {user_id}",
+            mcp_tool_called="create_audit_record",
+            mcp_tool_params={"user_id": user_id, "action": action, "details": details},
+            mcp_result=result
+        )
+        return result
+
     def _create_agent_instructions(self) -> str:
-        """Create instructions for the Azure AI Foundry Agent."""
-        return """You are an intelligent purchase order processing agent. Your job is to help users with purchase requests by analyzing their needs, checking policies, validating budgets, and providing recommendations.
-
-You have access to MCP tools that provide business data access:
-- get_user: Get user details including department
-- get_department_policy: Get department purchasing policy and allowed categories  
-- get_department_budget: Get current budget information
-- search_products: Search for products by name (supports fuzzy matching)
-- get_product_details: Get detailed product information including suppliers
-- get_supplier_info: Get supplier information 
-- create_audit_record: Create audit trail
-
-Your approach should be:
-1. Understand the user request and identify the user ID
-2. Use get_user to get user details and department
-3. Use get_department_policy to validate user permissions and check allowed categories
-4. Use get_department_budget to check budget constraints
-5. Use search_products to find relevant products
-6. Use get_product_details and get_supplier_info to analyze supplier options
-7. Make a recommendation with clear reasoning
-8. Use create_audit_record to create an audit trail
-
-Be methodical, explain your reasoning step by step, and provide helpful suggestions. Always use the MCP tools to gather the necessary business data before making recommendations."""
-
-    def process_purchase_request(self, user_id: str, product_request: str) -> AgentResult:
+        """Return the instructions for the Azure AI Foundry Agent in this instance's mode."""
+        return _AGENT_INSTRUCTIONS if self.use_mcp else DIRECT_MODE_INSTRUCTIONS
+
+    @property
+    def agent_name(self) -> str:
+        """Name of the persistent agent for this instance's mode."""
+        return AGENT_NAME if self.use_mcp else DIRECT_AGENT_NAME
+
+    def _get_project_client(self) -> AIProjectClient:
+        """Return the long-lived project client, creating it on first use."""
+        if self.project_client is None:
+            self.project_client = self._setup_project_client()
+            self._add_step(
+                action="Initialize Azure AI Foundry Client",
+                reasoning="Setting up connection to Azure AI Foundry Agent Service"
+            )
+        return self.project_client
+    
+    async def aensure_ready(self) -> str:
         """
-        Process a purchase request using Azure AI Foundry Agent Service with native MCP support.
+        Create the project client and the persistent agent ahead of the first request.
+        
+        Callers that issue several requests, such as the scenario demos, warm up once so
+        the credential handshake and agent creation are not part of the first request.
+        
+        Returns:
+            ID of the agent requests will run against
+        """
+        self._get_project_client()
+        return await self._get_or_create_agent(self._create_mcp_tool() if self.use_mcp else None)
+    
+    def ensure_ready(self) -> str:
+        """
+        Synchronous counterpart of ``aensure_ready``.
+        
+        Returns:
+            ID of the agent requests will run against
+        """
+        return self._run_sync(self.aensure_ready())
+    
+    async def _get_or_create_agent(self, mcp_tool: Optional[McpTool]) -> str:
+        """
+        Return the ID of the persistent agent, creating it only when missing.
+        
+        The agent is created once and reused by every subsequent request. An agent ID
+        supplied via ``AGENT_ID`` is verified with ``get_agent`` before reuse.
         
         Args:
-            user_id: ID of the user making the request
-            product_request: Description of what the user wants to purchase
+            mcp_tool: MCP tool whose definitions are attached to a newly created agent,
+                or None for a direct-mode agent that is created without tools
             
         Returns:
-            AgentResult containing the recommendation and execution details
+            ID of the agent to run requests against
         """
-        start_time = datetime.now()
-        self.execution_steps = []
-        self.step_counter = 0
+        if self._agent_ready:
+            return self.agent_id
         
-        self.logger.info(f"Starting purchase request processing for user {user_id}: {product_request}")
+        # Concurrent first requests wait here so only one of them creates the agent
+        async with self._agent_lock:
+            if self._agent_ready:
+                return self.agent_id
+            
+            client = self._get_project_client()
+            
+            if self.agent_id:
+                try:
+                    existing = await client.agents.get_agent(self.agent_id)
+                    if existing.name == self.agent_name:
+                        self._agent_ready = True
+                        self._add_step(
+                            action="Reuse Azure AI Foundry Agent",
+                            reasoning=f"Found existing agent {self.agent_id}"
+                        )
+                        return self.agent_id
+                    # An agent of the other mode has the wrong tools and instructions
+                    self.logger.warning(
+                        f"Agent {self.agent_id} is named '{existing.name}', not '{self.agent_name}'; creating a new one"
+                    )
+                except ResourceNotFoundError:
+                    self.logger.warning(f"Agent {self.agent_id} not found, creating a new one")
+            
+            # Create agent with native MCP tool support following official documentation
+            agent = await client.agents.create_agent(
+                model=self._model,
+                name=self.agent_name,
+                instructions=self._create_agent_instructions(),
+                # Only the MCP server and the audit function are attached; every extra tool
+                # definition is serialized into the prompt on each turn. Direct-mode agents
+                # never call tools, so they get none.
+                tools=mcp_tool.definitions + self.audit_tool.definitions if mcp_tool else []
+            )
+            self.agent_id = agent.id
+            self._agent_ready = True
+            self._owns_agent = True
+            
+            self._add_step(
+                action="Create Azure AI Foundry Agent",
+                reasoning=(
+                    "Created persistent agent with native MCP tool support" if mcp_tool else
+                    "Created persistent agent without tools for the direct workflow"
+                )
+            )
+            return self.agent_id
+    
+    async def _get_or_create_thread(self, user_id: str) -> str:
+        """
+        Check out the conversation thread for a user, reusing it across requests.
         
-        agent = None
-        try:
-            # Setup project client
-            self.project_client = self._setup_project_client()
+        A cached thread is removed from the cache while a request uses it, so a
+        concurrent request for the same user starts its own thread instead of hitting
+        the one-active-run-per-thread limit. Return it with ``_release_thread``.
+        
+        Args:
+            user_id: ID of the user making the request
             
+        Returns:
+            ID of the thread to post the request to
+        """
+        # Direct-mode messages carry all business data, so their threads are never reused
+        thread_id = self._thread_cache.pop(user_id, None) if self.use_mcp else None
+        if thread_id:
             self._add_step(
-                action="Initialize Azure AI Foundry Client",
-                reasoning="Setting up connection to Azure AI Foundry Agent Service"
+                action="Reuse Conversation Thread",
+                reasoning=f"Continuing existing thread for user {user_id}"
             )
+            return thread_id
+        
+        thread_id = (await self.project_client.agents.threads.create()).id
+        
+        self._add_step(
+            action="Create Conversation Thread",
+            reasoning="Started conversation thread with user request"
+        )
+        return thread_id
+    
+    def _release_thread(self, user_id: str, thread_id: str) -> None:
+        """
+        Return a thread to the cache after a successful request.
+        
+        Threads are kept in least-recently-used order and the oldest one is dropped
+        once more than ``max_cached_threads`` users are cached.
+        
+        Args:
+            user_id: ID of the user the thread belongs to
+            thread_id: ID of the thread to cache
+        """
+        if self.max_cached_threads <= 0 or not self.use_mcp:
+            return
+        self._thread_cache[user_id] = thread_id
+        self._thread_cache.move_to_end(user_id)
+        if len(self._thread_cache) > self.max_cached_threads:
+            self._thread_cache.popitem(last=False)
+
+    async def ashutdown(self, delete_agent: bool = True) -> None:
+        """
+        Release the persistent agent and close the project and MCP clients.
+        
+        Only agents created by this instance are deleted; an agent supplied via
+        ``AGENT_ID`` is left in place for other processes.
+        
+        Args:
+            delete_agent: Whether to delete the created agent. Pass False to keep it
+                for reuse via ``AGENT_ID``.
+        """
+        if self._mcp_client is not None:
+            await self._mcp_client.close()
+            self._mcp_client = None
+        
+        if self.project_client is None:
+            return
+        
+        try:
+            if delete_agent and self._owns_agent and self.agent_id:
+                try:
+                    await self.project_client.agents.delete_agent(self.agent_id)
+                    self.logger.info(f"Successfully deleted agent {self.agent_id}")
+                    self.agent_id = None
+                    self._owns_agent = False
+                except Exception as cleanup_error:
+                    self.logger.error(f"Failed to clean up agent {self.agent_id}: {cleanup_error}")
+        finally:
+            await self.project_client.close()
+            await self._credential.close()
+            self.project_client = None
+            self._credential = None
+            self._agent_ready = False
+            self._thread_cache.clear()
+    
+    def shutdown(self, delete_agent: bool = True) -> None:
+        """
+        Synchronous counterpart of ``ashutdown`` for use with ``process_purchase_request``.
+        
+        Args:
+            delete_agent: Whether to delete the created agent
+        """
+        try:
+            if self.project_client is not None:
+                self._run_sync(self.ashutdown(delete_agent))
+        finally:
+            if self._loop is not None:
+                self._loop.close()
+                self._loop = None
+    
+    def _run_sync(self, coroutine: Any) -> Any:
+        """
+        Run a coroutine to completion on this instance's private event loop.
+        
+        The async clients stay bound to the loop they were opened on, so all synchronous
+        calls share one loop instead of ``asyncio.run`` creating a new loop per call.
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coroutine)
+    
+    def __enter__(self) -> "AzureAIFoundryAgent":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.shutdown()
+    
+    async def __aenter__(self) -> "AzureAIFoundryAgent":
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.ashutdown()
+
+    def _cached_user_context(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the still valid user context captured for a user, if any."""
+        entry = self._user_context.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._user_context[user_id]
+            return None
+        return entry[1]
+
+    async def _capture_user_context(self, thread_id: str, run_id: str, user_id: str) -> None:
+        """
+        Store the user context tool outputs of a completed MCP-mode run.
+        
+        Args:
+            thread_id: Thread the run belongs to
+            run_id: ID of the completed run
+            user_id: ID of the user the run was for
+        """
+        context: Dict[str, Any] = {}
+        async for run_step in self.project_client.agents.run_steps.list(thread_id=thread_id, run_id=run_id):
+            for tool_call in getattr(run_step.step_details, "tool_calls", None) or []:
+                if tool_call.type == "mcp" and tool_call.name in _USER_CONTEXT_TOOLS and tool_call.output:
+                    try:
+                        output = json.loads(tool_call.output)
+                    except ValueError:
+                        output = tool_call.output
+                    # Lookups of unknown IDs are answered with {"found": false, ...}
+                    if isinstance(output, dict) and output.get("found") is False:
+                        continue
+                    context[tool_call.name] = output
+        
+        if context:
+            self._user_context[user_id] = (time.monotonic() + self.user_context_ttl_seconds, context)
+
+    async def _execute_run(self, thread_id: str, agent_id: str,
+                     **run_options: Any) -> Tuple[ThreadRun, Optional[str]]:
+        """
+        Run the agent on a thread, executing function calls within the run budgets.
+        
+        Failed tool calls make the service re-send the whole history, so runs that keep
+        failing or looping are cancelled instead of letting token usage grow unbounded.
+        
+        Args:
+            thread_id: Thread holding the user request
+            agent_id: Agent to run
+            **run_options: Additional arguments for ``runs.create``, e.g. the request
+                message and tool resources
             
-            # Create MCP tool with native support
-            mcp_tool = self._create_mcp_tool()
+        Returns:
+            The last observed run and the reason it was cancelled, or None if it finished
+        """
+        client = self.project_client
+        start_time = time.monotonic()
+        tool_rounds = 0
+        tool_call_errors = 0
+        last_error_seen = None
+        
+        run = await client.agents.runs.create(thread_id=thread_id, agent_id=agent_id, **run_options)
+        
+        while run.status in _ACTIVE_RUN_STATUSES:
+            await asyncio.sleep(RUN_POLL_INTERVAL_SECONDS)
+            run = await client.agents.runs.get(thread_id=thread_id, run_id=run.id)
+            
+            # The same error is reported on every poll until the run moves on, so each
+            # distinct error counts once
+            error = (run.last_error.code, run.last_error.message) if run.last_error else None
+            if error and error != last_error_seen:
+                tool_call_errors += 1
+            last_error_seen = error
+            
+            if run.status == RunStatus.REQUIRES_ACTION and isinstance(run.required_action, SubmitToolOutputsAction):
+                tool_rounds += 1
+                tool_outputs = []
+                for tool_call in run.required_action.submit_tool_outputs.tool_calls:
+                    output = self.audit_tool.execute(tool_call)
+                    if _is_tool_error(output):
+                        tool_call_errors += 1
+                    tool_outputs.append(ToolOutput(tool_call_id=tool_call.id, output=output))
+                
+                if tool_outputs:
+                    run = await client.agents.runs.submit_tool_outputs(
+                        thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs
+                    )
+            
+            abort_reason = None
+            if tool_call_errors > self.max_tool_errors:
+                abort_reason = f"{tool_call_errors} tool call errors exceeded the budget of {self.max_tool_errors}"
+            elif tool_rounds > self.max_steps:
+                abort_reason = f"{tool_rounds} tool call rounds exceeded the budget of {self.max_steps}"
+            elif time.monotonic() - start_time > self.max_run_seconds:
+                abort_reason = f"Run exceeded the {self.max_run_seconds}s time budget"
+            
+            if abort_reason and run.status in _ACTIVE_RUN_STATUSES:
+                self.logger.warning(f"Cancelling run {run.id}: {abort_reason}")
+                run = await client.agents.runs.cancel(thread_id=thread_id, run_id=run.id)
+                return run, abort_reason
+        
+        return run, None
+
+    async def _get_mcp_client(self) -> FastMCPClient:
+        """
+        Return the long-lived MCP client, opening it on first use.
+        
+        Every opened client costs an initialize handshake, so the session is kept and
+        shared by concurrent requests until ``ashutdown``.
+        """
+        if self._mcp_client is not None:
+            return self._mcp_client
+        
+        async with self._mcp_lock:
+            if self._mcp_client is None:
+                mcp = FastMCPClient(self.mcp_http_url)
+                await mcp.open()
+                self._mcp_client = mcp
+        return self._mcp_client
+
+    async def _gather_context(self, user_id: str, product_request: str) -> Dict[str, Any]:
+        """
+        Collect the business data for a request with parallel MCP calls.
+        
+        Calls that do not depend on each other are issued concurrently: the user lookup
+        and product searches, then the department policy, budget and product offers,
+        and finally the suppliers behind those offers.
+        
+        Args:
+            user_id: ID of the user making the request
+            product_request: Description of what the user wants to purchase
             
+        Returns:
+            Dictionary with user, department policy and budget, candidate products with
+            their offers, supplier information, and all offers ranked by budget fit and
+            supplier reliability. Failed lookups hold an ``error`` key.
+        """
+        mcp = await self._get_mcp_client()
+        
+        async def call(tool_name: str, **arguments: Any) -> Any:
+            cached = False
+            try:
+                if self.tool_cache is None:
+                    result = await mcp.call_tool(tool_name, arguments)
+                else:
+                    result, cached = await self.tool_cache.get_or_compute(
+                        tool_name, arguments, lambda: mcp.call_tool(tool_name, arguments)
+                    )
+            except MCPToolError as e:
+                result = {"error": str(e)}
             self._add_step(
-                action="Create MCP Tool",
-                reasoning="Setup native MCP integration for business data access"
+                action=f"Call {tool_name}",
+                reasoning=(
+                    "Reused business data cached from an earlier MCP call" if cached else
+                    "Gathered business data with a direct MCP call"
+                ),
+                mcp_tool_called=tool_name,
+                mcp_tool_params=arguments,
+                mcp_result=json.dumps(result, default=str),
+                mcp_result_source="cache" if cached else "server"
             )
+            return result
+        
+        user, *searches = await asyncio.gather(
+            call("get_user", user_id=user_id),
+            *(call("search_products", name=term) for term in _search_terms(product_request))
+        )
+        
+        products: Dict[str, Dict[str, Any]] = {}
+        for found in searches:
+            if isinstance(found, list):
+                for product in found:
+                    products.setdefault(product["product_id"], product)
+        candidates = list(products.values())[:MAX_DIRECT_CANDIDATES]
+        
+        department_id = user.get("department_id") if isinstance(user, dict) else None
+        department_calls = [
+            call("get_department_policy", department_id=department_id),
+            call("get_department_budget", department_id=department_id),
+        ] if department_id else []
+        
+        results = await asyncio.gather(
+            *department_calls,
+            *(call("get_product_details", product_id=p["product_id"]) for p in candidates)
+        )
+        policy, budget = results[:2] if department_id else (None, None)
+        offers = results[len(department_calls):]
+        
+        supplier_ids = sorted({
+            detail["supplier_id"]
+            for details in offers if isinstance(details, list)
+            for detail in details
+        })
+        suppliers = await asyncio.gather(
+            *(call("get_supplier_info", supplier_id=supplier_id) for supplier_id in supplier_ids)
+        )
+        
+        supplier_info = dict(zip(supplier_ids, suppliers))
+        all_offers = [detail for details in offers if isinstance(details, list) for detail in details]
+        # A failed budget lookup leaves the budget unknown rather than exhausted
+        remaining_budget = budget.get("remaining_budget") if isinstance(budget, dict) else None
+        ranking = rank_offer_indices(all_offers, supplier_info, remaining_budget)
+        
+        return {
+            "user": user,
+            "department_policy": policy,
+            "department_budget": budget,
+            "products": [{**product, "offers": details} for product, details in zip(candidates, offers)],
+            "suppliers": supplier_info,
+            "ranked_offers": [all_offers[i] for i in ranking],
+        }
+
+    def process_purchase_request(self, user_id: str, product_request: str,
+                                 on_step: Optional[Callable[[AgentStep], None]] = None) -> AgentResult:
+        """
+        Synchronous wrapper around ``aprocess_purchase_request``.
+        
+        Call ``shutdown()`` (or use the instance as a context manager) to release the
+        agent and project client afterwards.
+        
+        Args:
+            user_id: ID of the user making the request
+            product_request: Description of what the user wants to purchase
+            on_step: Called with each step as soon as it is recorded
             
-            with self.project_client:
-                # Create agent with native MCP tool support following official documentation
-                agent = self.project_client.agents.create_agent(
-                    model=os.getenv("MODEL_DEPLOYMENT_NAME"),
-                    name="purchase-order-agent",
-                    instructions=self._create_agent_instructions(),
-                    tools=mcp_tool.definitions  # Use mcp_tool.definitions as per official docs
-                )
-                
-                self.agent_id = agent.id
+        Returns:
+            AgentResult containing the recommendation and execution details
+        """
+        return self._run_sync(self.aprocess_purchase_request(user_id, product_request, on_step))
+
+    async def aprocess_purchase_request(self, user_id: str, product_request: str,
+                                        on_step: Optional[Callable[[AgentStep], None]] = None) -> AgentResult:
+        """
+        Process a purchase request using Azure AI Foundry Agent Service with native MCP support.
+        
+        The agent and project client are created on the first call and reused afterwards;
+        call ``ashutdown()`` (or use the instance as an async context manager) to release them.
+        
+        Args:
+            user_id: ID of the user making the request
+            product_request: Description of what the user wants to purchase
+            on_step: Called with each step as soon as it is recorded, so callers can
+                report progress before the run completes
+            
+        Returns:
+            AgentResult containing the recommendation and execution details
+        """
+        start_time = time.perf_counter()
+        steps: List[AgentStep] = []
+        _REQUEST_STEPS.set(steps)
+        _STEP_CALLBACK.set(on_step)
+        
+        self.logger.info(f"Starting purchase request processing for user {user_id}: {product_request}")
+        
+        try:
+            client = self._get_project_client()
+            
+            mcp_tool = None
+            if self.use_mcp:
+                # Create MCP tool with native support
+                mcp_tool = self._create_mcp_tool()
                 
                 self._add_step(
-                    action="Create Azure AI Foundry Agent",
-                    reasoning="Created agent with native MCP tool support"
+                    action="Create MCP Tool",
+                    reasoning="Setup native MCP integration for business data access"
                 )
-                
-                try:
-                    # Create thread for conversation
-                    thread = self.project_client.agents.threads.create()
-                    
-                    # Add initial message
-                    self.project_client.agents.messages.create(
-                        thread_id=thread.id,
-                        role="user",
-                        content=f"I need help with a purchase request. User ID: {user_id}, Request: {product_request}"
-                    )
-                    
-                    self._add_step(
-                        action="Create Conversation Thread",
-                        reasoning="Started conversation thread with user request"
-                    )
-                    
-                    # Run the agent with MCP tool resources (following turnkey integration pattern)
-                    run = self.project_client.agents.runs.create_and_process(
-                        thread_id=thread.id,
-                        agent_id=agent.id,
-                        tool_resources=mcp_tool.resources  # Include MCP tool resources
-                    )
-                    
-                    self._add_step(
-                        action="Execute Agent Run",
-                        reasoning=f"Agent completed with status: {run.status}"
+            
+            agent_id = await self._get_or_create_agent(mcp_tool)
+            
+            thread_id = await self._get_or_create_thread(user_id)
+            
+            product_request = " ".join(product_request.split())
+            content = f"User ID: {user_id}\nRequest: {product_request}"
+            known_context = None
+            if self.use_mcp:
+                known_context = self._cached_user_context(user_id) if self.cache else None
+                if known_context:
+                    content += (
+                        "\n\nAlready retrieved for this user, do not call these tools again:\n"
+                        f"{json.dumps(known_context, separators=(',', ':'), default=str)}"
                     )
-                    
-                    if run.status == "failed":
-                        error_msg = f"Agent run failed: {run.last_error}"
-                        self.logger.error(error_msg)
-                        raise Exception(error_msg)
-                    
-                    # Get the final response
-                    messages = self.project_client.agents.messages.list(thread_id=thread.id)
-                    
-                    # Find the assistant's response
-                    recommendation = "No response from agent"
-                    for msg in messages:
-                        if msg.role == "assistant" and msg.content:
-                            # Get the text content
-                            for content in msg.content:
-                                if hasattr(content, 'text') and content.text:
-                                    recommendation = content.text.value
-                                    break
-                            break
-                    
                     self._add_step(
-                        action="Get Agent Response",
-                        reasoning="Retrieved final recommendation from agent"
+                        action="Reuse User Context",
+                        reasoning=f"Passed cached results of {', '.join(known_context)} from an earlier request"
                     )
+                run_options = {
+                    "tool_resources": mcp_tool.resources,
+                    "tool_choice": self.tool_choice,
+                    "parallel_tool_calls": self.parallel_tool_calls,
+                    "truncation_strategy": TruncationObject(
+                        type=TruncationStrategy.LAST_MESSAGES, last_messages=THREAD_HISTORY_MESSAGES
+                    ),
+                }
+            else:
+                context = await self._gather_context(user_id, product_request)
+                content += f"\n\nBusiness data:\n{json.dumps(context, separators=(',', ':'), default=str)}"
+                # The direct-mode agent has no tools and already carries the direct instructions
+                run_options = {}
+            if self.max_completion_tokens is not None:
+                run_options["max_completion_tokens"] = self.max_completion_tokens
+            
+            # The request is posted with the run itself, saving a separate messages.create call
+            run_options["additional_messages"] = [ThreadMessageOptions(role=MessageRole.USER, content=content)]
+            for attempt in range(self.max_rate_limit_retries + 1):
+                run, abort_reason = await self._execute_run(thread_id, agent_id, **run_options)
+                if not _is_rate_limited(run) or attempt == self.max_rate_limit_retries:
+                    break
                 
-                finally:
-                    # Always clean up the agent, even if there was an error
-                    if agent and agent.id:
-                        try:
-                            self.project_client.agents.delete_agent(agent.id)
-                            self._add_step(
-                                action="Clean Up Agent",
-                                reasoning="Deleted temporary agent instance"
-                            )
-                            self.logger.info(f"Successfully deleted agent {agent.id}")
-                        except Exception as cleanup_error:
-                            self.logger.error(f"Failed to clean up agent {agent.id}: {cleanup_error}")
-                
-                end_time = datetime.now()
-                
+                delay = min(RATE_LIMIT_BACKOFF_MAX_SECONDS, RATE_LIMIT_BACKOFF_SECONDS * 2 ** attempt)
+                self.logger.warning(f"Run {run.id} was rate limited, retrying in {delay}s")
+                await asyncio.sleep(delay)
+                # The failed run already added the request message to the thread
+                run_options.pop("additional_messages", None)
+            
+            self._add_step(
+                action="Execute Agent Run",
+                reasoning=f"Agent completed with status: {run.status}"
+            )
+            
+            if abort_reason:
                 return AgentResult(
-                    success=True,
-                    recommendation=recommendation,
-                    reasoning="Azure AI Foundry Agent completed purchase request analysis using native MCP tools",
-                    total_steps=len(self.execution_steps),
-                    execution_time_seconds=(end_time - start_time).total_seconds(),
-                    steps=self.execution_steps
+                    success=False,
+                    recommendation="Agent run was cancelled before producing a recommendation",
+                    reasoning=abort_reason,
+                    total_steps=len(steps),
+                    execution_time_seconds=time.perf_counter() - start_time,
+                    steps=steps,
+                    error_message=abort_reason
+                )
+            
+            # Incomplete runs (e.g. the completion token budget ran out), expired and
+            # cancelled runs leave at best a partial recommendation
+            if run.status != RunStatus.COMPLETED:
+                details = run.last_error or run.incomplete_details
+                error_msg = f"Agent run ended with status {run.status}: {details}"
+                self.logger.error(error_msg)
+                raise Exception(error_msg)
+            
+            # Fetch only the newest message of this run instead of the whole thread history
+            messages = client.agents.messages.list(
+                thread_id=thread_id,
+                run_id=run.id,
+                limit=1,
+                order=ListSortOrder.DESCENDING
+            )
+            latest = None
+            async for message in messages:
+                latest = message
+                break
+            
+            recommendation = "No response from agent"
+            if latest and latest.role == "assistant" and latest.content:
+                for content in latest.content:
+                    if hasattr(content, 'text') and content.text:
+                        recommendation = content.text.value
+                        break
+            
+            self._add_step(
+                action="Get Agent Response",
+                reasoning="Retrieved final recommendation from agent"
+            )
+            
+            if self.use_mcp and self.cache and not known_context:
+                try:
+                    await self._capture_user_context(thread_id, run.id, user_id)
+                except Exception as e:
+                    # Only an optimization for later requests, so never fail this one
+                    self.logger.warning(f"Could not capture user context for {user_id}: {e}")
+            
+            if not self.use_mcp:
+                self.create_audit_record(
+                    user_id=user_id,
+                    action="purchase_recommendation",
+                    details={"product_request": product_request},
+                    decision_reasoning=recommendation
                 )
             
+            self._release_thread(user_id, thread_id)
+            
+            return AgentResult(
+                success=True,
+                recommendation=recommendation,
+                reasoning=(
+                    "Azure AI Foundry Agent completed purchase request analysis using native MCP tools"
+                    if self.use_mcp else
+                    "Azure AI Foundry Agent produced a recommendation from business data gathered with direct MCP calls"
+                ),
+                total_steps=len(steps),
+                execution_time_seconds=time.perf_counter() - start_time,
+                steps=steps
+            )
+            
         except Exception as e:
             error_msg = f"Unexpected error during processing: {str(e)}"
             self.logger.error(error_msg, exc_info=True)
             
-            # Emergency cleanup - try to delete agent if it was created
-            if self.project_client and agent and agent.id:
-                try:
-                    with self.project_client:
-                        self.project_client.agents.delete_agent(agent.id)
-                        self.logger.info(f"Emergency cleanup: Successfully deleted agent {agent.id}")
-                except Exception as cleanup_error:
-                    self.logger.error(f"Emergency cleanup failed for agent {agent.id}: {cleanup_error}")
-            
-            end_time = datetime.now()
             return AgentResult(
                 success=False,
                 recommendation="Failed to process request due to unexpected error",
                 reasoning=error_msg,
-                total_steps=len(self.execution_steps),
-                execution_time_seconds=(end_time - start_time).total_seconds(),
-                steps=self.execution_steps,
+                total_steps=len(steps),
+                execution_time_seconds=time.perf_counter() - start_time,
+                steps=steps,
                 error_message=error_msg
             )
 
 
+def _search_terms(product_request: str) -> List[str]:
+    """Extract candidate product search terms from a free-text purchase request."""
+    terms = []
+    for word in re.findall(r"[a-z]+", product_request.lower()):
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        if len(word) > 3 and word not in _SEARCH_STOPWORDS and word not in terms:
+            terms.append(word)
+    return terms or [product_request]
+
+
+def _is_rate_limited(run: ThreadRun) -> bool:
+    """Check whether a run failed because the model deployment was rate limited."""
+    return run.status == RunStatus.FAILED and getattr(run.last_error, "code", None) == "rate_limit_exceeded"
+
+
+def _is_tool_error(output: Any) -> bool:
+    """Check whether a function tool output is the error payload produced by FunctionTool."""
+    try:
+        payload = json.loads(output)
+    except (TypeError, ValueError):
+        return False
+    return isinstance(payload, dict) and "error" in payload
+
+
 # Convenience function for standalone usage
 def process_purchase_request(user_id: str, product_request: str, config_path: Optional[Path] = None) -> AgentResult:
     """
@@ -375,8 +1105,8 @@ def process_purchase_request(user_id: str, product_request: str, config_path: Op
     Returns:
         AgentResult containing the recommendation and execution details
     """
-    agent = AzureAIFoundryAgent(config_path)
-    return agent.process_purchase_request(user_id, product_request)
+    with AzureAIFoundryAgent(config_path) as agent:
+        return agent.process_purchase_request(user_id, product_request)
 
 
 # Legacy alias for backward compatibility
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Garbage collection for persistent Azure AI Foundry agents.
+
+AzureAIFoundryAgent keeps one agent alive across requests and deletes it on
+shutdown(). Agents left behind by interrupted processes are removed here.
+
+Usage:
+    uv run python cleanup_agents.py            # list matching agents
+    uv run python cleanup_agents.py --delete   # delete matching agents
+"""
+
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from dotenv import load_dotenv
+from azure.ai.projects import AIProjectClient
+from azure.identity import DefaultAzureCredential
+
+from azure_ai_agent import AGENT_NAME
+
+
+MAX_DELETE_WORKERS = 16
+LIST_PAGE_SIZE = 100
+
+
+def cleanup_agents(name_filter: str = AGENT_NAME, delete: bool = False) -> int:
+    """
+    List, and optionally delete, agents whose name contains the filter.
+
+    Args:
+        name_filter: Substring matched against agent names
+        delete: Whether to delete the matching agents
+
+    Returns:
+        Number of matching agents
+    """
+    load_dotenv(Path(__file__).parent / ".env")
+
+    client = AIProjectClient(
+        endpoint=os.getenv("PROJECT_ENDPOINT"),
+        credential=DefaultAzureCredential()
+    )
+
+    with client:
+        # list_agents has no server-side name filter, so filter pages lazily as they
+        # arrive and keep only the IDs. Deleting is deferred until paging finishes
+        # because the next page is requested relative to the last listed agent.
+        matching_ids = []
+        for agent in client.agents.list_agents(limit=LIST_PAGE_SIZE):
+            if agent.name and name_filter in agent.name:
+                matching_ids.append(agent.id)
+                print(f"  - {agent.id} ({agent.name}, created {agent.created_at})")
+
+        print(f"Found {len(matching_ids)} agents matching '{name_filter}'")
+
+        if delete:
+            # Deletions are independent network calls, so run them concurrently
+            with ThreadPoolExecutor(max_workers=MAX_DELETE_WORKERS) as executor:
+                futures = {executor.submit(client.agents.delete_agent, agent_id): agent_id for agent_id in matching_ids}
+                deleted = 0
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                        deleted += 1
+                    except Exception as e:
+                        print(f"❌ Failed to delete {futures[future]}: {e}")
+            print(f"🧹 Deleted {deleted}/{len(matching_ids)} agents")
+
+    return len(matching_ids)
+
+
+def main():
+    """Main entry point for the cleanup script."""
+    parser = argparse.ArgumentParser(description='List or delete persistent Azure AI Foundry agents')
+    parser.add_argument('--name', default=AGENT_NAME, help='Substring of the agent name to match')
+    parser.add_argument('--delete', action='store_true', help='Delete the matching agents')
+    args = parser.parse_args()
+
+    cleanup_agents(args.name, args.delete)
+
+
+if __name__ == "__main__":
+    main()
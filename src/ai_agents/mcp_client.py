@@ -0,0 +1,284 @@
+"""
+Minimal MCP client for FastMCP servers over Streamable HTTP.
+
+Used by the direct (non-agentic) workflow in ``azure_ai_agent`` to call the business
+tools from Python instead of letting the model issue one tool call per turn.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import httpx
+
+try:
+    import orjson
+except ImportError:  # optional speedup, installed with the 'fast' extra
+    orjson = None
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+except ImportError:  # optional, installed with the 'fast' extra
+    h2 = None
+
+
+MCP_PROTOCOL_VERSION = "2025-03-26"
+MAX_IN_FLIGHT_REQUESTS = 10
+CONNECT_TIMEOUT_SECONDS = 5.0
+# Connections kept open between calls, so repeated calls skip the TCP/TLS handshake
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+TOOL_CACHE_MAX_ENTRIES = 1000
+TOOL_CACHE_TTL_SECONDS = 3600
+# Per-tool TTLs overriding the default; 0 disables caching. Department budgets shrink
+# as money is spent, so they are always read fresh.
+TOOL_CACHE_TTLS: Dict[str, float] = {"get_department_budget": 0}
+
+
+def _dumps(data: Any) -> bytes:
+    """Encode a JSON-RPC message body."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data: Union[str, bytes]) -> Any:
+    """Decode a JSON-RPC message or tool output."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class MCPToolError(Exception):
+    """Raised when an MCP request or tool call returns an error."""
+
+
+class FastMCPClient:
+    """
+    Async JSON-RPC client for a FastMCP server's Streamable HTTP endpoint.
+
+    Use as an async context manager, or call ``open`` and ``close`` explicitly; the
+    session is initialized on opening and independent tool calls can be awaited
+    concurrently on the same client. Opening costs an initialize handshake, so keep
+    one client per server for as long as it is needed instead of one per call.
+    """
+
+    def __init__(self, server_url: str, timeout: float = 30.0,
+                 max_in_flight: int = MAX_IN_FLIGHT_REQUESTS,
+                 http_client: Optional[httpx.AsyncClient] = None):
+        """
+        Initialize the client.
+
+        Args:
+            server_url: Streamable HTTP endpoint, e.g. http://localhost:8000/mcp/
+            timeout: Timeout in seconds for each HTTP request
+            max_in_flight: Maximum number of requests sent at the same time; further
+                concurrent calls wait for a free slot
+            http_client: Preconfigured HTTP client to send requests with; it is not
+                closed with this client. By default a pooled client is created, using
+                HTTP/2 when the h2 package is installed.
+        """
+        self.server_url = server_url
+        self.timeout = timeout
+        self.session_id: Optional[str] = None
+        self._request_id = 0
+        self._http: Optional[httpx.AsyncClient] = http_client
+        self._owns_http = http_client is None
+        self._in_flight = asyncio.BoundedSemaphore(max(1, max_in_flight))
+
+    async def __aenter__(self) -> "FastMCPClient":
+        await self.open()
+        return self
+
+    async def open(self) -> None:
+        """Create the HTTP client and initialize the MCP session."""
+        if self._owns_http:
+            self._http = httpx.AsyncClient(
+                http2=h2 is not None,
+                limits=HTTP_LIMITS,
+                timeout=httpx.Timeout(self.timeout, connect=CONNECT_TIMEOUT_SECONDS)
+            )
+        try:
+            await self.initialize()
+        except BaseException:
+            await self.close()
+            raise
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the underlying HTTP client unless it was supplied by the caller."""
+        if self._owns_http and self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {
+            "Accept": "application/json, text/event-stream",
+            "Content-Type": "application/json",
+        }
+        if self.session_id:
+            headers["mcp-session-id"] = self.session_id
+        return headers
+
+    async def _send_request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Send a JSON-RPC request and return its result.
+
+        Args:
+            method: JSON-RPC method name
+            params: Method parameters
+
+        Returns:
+            The ``result`` member of the JSON-RPC response
+
+        Raises:
+            MCPToolError: If the server returns a JSON-RPC error or no response
+        """
+        self._request_id += 1
+        request_id = self._request_id
+        payload = {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}}
+
+        async with self._in_flight, self._http.stream(
+            "POST", self.server_url, content=_dumps(payload), headers=self._headers()
+        ) as response:
+            response.raise_for_status()
+
+            if "mcp-session-id" in response.headers:
+                self.session_id = response.headers["mcp-session-id"]
+
+            if response.headers.get("content-type", "").startswith("text/event-stream"):
+                # The response is an SSE stream; read it line by line and stop at the
+                # message answering this request instead of buffering the whole body
+                message = None
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        data = _loads(line[5:])
+                        if data.get("id") == request_id:
+                            message = data
+                            break
+            else:
+                message = _loads(await response.aread())
+
+        if not message:
+            raise MCPToolError(f"No response to MCP request '{method}'")
+        if "error" in message:
+            raise MCPToolError(f"MCP request '{method}' failed: {message['error']}")
+        return message["result"]
+
+    async def _send_notification(self, method: str) -> None:
+        """Send a JSON-RPC notification, which has no response body."""
+        payload = {"jsonrpc": "2.0", "method": method}
+        response = await self._http.post(self.server_url, content=_dumps(payload), headers=self._headers())
+        response.raise_for_status()
+
+    async def initialize(self) -> Dict[str, Any]:
+        """
+        Perform the MCP initialization handshake.
+
+        Returns:
+            Server capabilities and information
+        """
+        result = await self._send_request("initialize", {
+            "protocolVersion": MCP_PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": "ai-agents", "version": "0.1.0"},
+        })
+        await self._send_notification("notifications/initialized")
+        return result
+
+    async def list_tools(self) -> List[Dict[str, Any]]:
+        """List the tools exposed by the server."""
+        result = await self._send_request("tools/list")
+        return result.get("tools", [])
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Call a tool and return its decoded JSON output.
+
+        Args:
+            name: Tool name
+            arguments: Tool arguments
+
+        Returns:
+            The tool output decoded from JSON, or the raw text if it is not JSON
+
+        Raises:
+            MCPToolError: If the tool reports an error
+        """
+        result = await self._send_request("tools/call", {"name": name, "arguments": arguments or {}})
+        text = "".join(c.get("text", "") for c in result.get("content", []) if c.get("type") == "text")
+
+        if result.get("isError"):
+            raise MCPToolError(text or f"Tool '{name}' failed")
+
+        try:
+            return _loads(text)
+        except ValueError:
+            return text
+
+
+class ToolResultCache:
+    """
+    TTL cache of MCP tool results keyed by tool name and arguments.
+
+    Lookups share in-flight calls as well as finished ones, so concurrent requests
+    asking for the same data wait on a single MCP round trip. Failed calls are not
+    cached. The oldest entries are evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries: int = TOOL_CACHE_MAX_ENTRIES,
+                 default_ttl: float = TOOL_CACHE_TTL_SECONDS,
+                 ttls: Optional[Dict[str, float]] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached results
+            default_ttl: How long a result stays valid, in seconds
+            ttls: TTLs of individual tools, overriding ``default_ttl``; results of tools
+                with a TTL of 0 are never cached. Defaults to ``TOOL_CACHE_TTLS``.
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = TOOL_CACHE_TTLS if ttls is None else ttls
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, asyncio.Future]]" = OrderedDict()
+
+    async def get_or_compute(self, tool_name: str, arguments: Dict[str, Any],
+                             compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Return the cached result of a tool call, computing it on a miss.
+
+        Args:
+            tool_name: Tool name
+            arguments: Tool arguments
+            compute: Performs the actual tool call
+
+        Returns:
+            The tool result and whether it came from the cache
+        """
+        ttl = self.ttls.get(tool_name, self.default_ttl)
+        if ttl <= 0:
+            return await compute(), False
+
+        key = (tool_name, json.dumps(arguments, sort_keys=True, default=str))
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            return await asyncio.shield(entry[1]), True
+
+        future = asyncio.ensure_future(compute())
+        self._entries[key] = (time.monotonic() + ttl, future)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        try:
+            return await asyncio.shield(future), False
+        except BaseException:
+            if self._entries.get(key, (None, None))[1] is future:
+                del self._entries[key]
+            raise
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        self._entries.clear()
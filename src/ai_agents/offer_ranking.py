@@ -0,0 +1,99 @@
+"""
+Deterministic supplier offer ranking for the direct workflow.
+
+Offers that fit the remaining budget rank first, ordered by supplier reliability and
+then by total cost. When Numba is installed (``uv sync --extra fast``) the scoring
+loop is compiled to native code; otherwise the same ranking runs in pure Python.
+"""
+
+from typing import Any, Dict, List, Optional
+
+try:
+    import numba
+    import numpy as np
+except ImportError:  # pragma: no cover - optional acceleration
+    numba = None
+
+
+# Weight of one reliability point (0-10 scale) relative to spending the whole budget
+RELIABILITY_WEIGHT = 0.1
+# Subtracted from the score of offers that exceed the budget, so they sort last
+OVER_BUDGET_PENALTY = 1e9
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def rank_offers(prices: "np.ndarray", reliabilities: "np.ndarray", budget: float,
+                    cost_scale: float, qty: int) -> "np.ndarray":
+        """
+        Rank offers by score, best first.
+
+        Args:
+            prices: Unit price of each offer
+            reliabilities: Reliability score (0-10) of each offer's supplier
+            budget: Remaining budget; offers costing more are penalized
+            cost_scale: Total cost that weighs as much as ten reliability points
+            qty: Quantity to order
+
+        Returns:
+            Offer indices ordered from best to worst
+        """
+        scores = np.empty(prices.shape[0])
+        for i in range(prices.shape[0]):
+            total = prices[i] * qty
+            score = reliabilities[i] * RELIABILITY_WEIGHT - total / cost_scale
+            if total > budget:
+                # Over-budget offers stay listed but always sort after affordable ones
+                score -= OVER_BUDGET_PENALTY
+            scores[i] = score
+        return np.argsort(-scores, kind="mergesort")
+
+
+def _score(price: float, reliability: float, budget: float, cost_scale: float, qty: int) -> float:
+    total = price * qty
+    score = reliability * RELIABILITY_WEIGHT - total / cost_scale
+    return score - OVER_BUDGET_PENALTY if total > budget else score
+
+
+def rank_offer_indices(offers: List[Dict[str, Any]], suppliers: Dict[str, Any],
+                       budget: Optional[float], qty: int = 1) -> List[int]:
+    """
+    Rank product offers against the remaining budget and supplier reliability.
+
+    Args:
+        offers: Offers with ``supplier_id`` and ``price`` keys
+        suppliers: Supplier information keyed by supplier ID
+        budget: Remaining budget. A non-positive budget fits no paid offer, so all of
+            them are ranked as over budget. None means the budget is unknown; offers
+            are then ranked by reliability and price alone.
+        qty: Quantity to order
+
+    Returns:
+        Indices into ``offers`` ordered from best to worst
+    """
+    if not offers:
+        return []
+
+    prices = [float(offer["price"]) for offer in offers]
+    reliabilities = [
+        float(supplier.get("reliability_score", 0.0)) if isinstance(supplier, dict) else 0.0
+        for supplier in (suppliers.get(offer["supplier_id"]) for offer in offers)
+    ]
+
+    if budget is not None and budget > 0:
+        cost_scale = float(budget)
+    else:
+        # Without a usable budget, costs are weighed relative to the most expensive offer
+        cost_scale = max(price * qty for price in prices) or 1.0
+    budget = float("inf") if budget is None else float(budget)
+
+    if numba is not None:
+        return rank_offers(
+            np.asarray(prices, dtype=np.float64),
+            np.asarray(reliabilities, dtype=np.float64),
+            budget,
+            cost_scale,
+            qty
+        ).tolist()
+
+    scores = [_score(p, r, budget, cost_scale, qty) for p, r in zip(prices, reliabilities)]
+    return sorted(range(len(offers)), key=lambda i: -scores[i])
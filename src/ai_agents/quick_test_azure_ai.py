@@ -24,6 +24,7 @@ def main():
     """Run a quick test of the Azure AI Agent."""
     print("=== Azure AI Agent Quick Test ===")
     
+    agent = None
     try:
         # Initialize the agent
         print("1. Initializing Azure AI Agent...")
@@ -58,6 +59,9 @@ def main():
         print(f"❌ Test failed: {str(e)}")
         import traceback
         traceback.print_exc()
+    finally:
+        if agent:
+            agent.shutdown()
 
 
 if __name__ == "__main__":
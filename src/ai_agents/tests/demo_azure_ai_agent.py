@@ -10,20 +10,40 @@ Usage:
     python demo_azure_ai_agent.py
 """
 
+import asyncio
+import gzip
 import json
-import logging
+import os
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import TYPE_CHECKING, Dict, List, Any
 
-# Add parent directory to path for imports
-sys.path.append(str(Path(__file__).parent.parent))
-sys.path.append(str(Path(__file__).parent.parent.parent / "mcp_server" / "tests"))
-from azure_ai_agent import AzureAIFoundryAgent, AgentResult
+from scenarios import BaseTester, Scenario, analyze
 
+if TYPE_CHECKING:
+    from azure_ai_agent import AgentResult
 
-class BusinessScenarioTester:
+try:
+    import orjson
+except ImportError:  # optional speedup, installed with the 'fast' extra
+    orjson = None
+
+
+def _dumps_results(results: List[Dict[str, Any]]) -> bytes:
+    """Serialize the summary records to indented UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str)
+    return json.dumps(results, indent=2, default=str).encode("utf-8")
+
+
+def _write_lines(lines: List[str]) -> None:
+    """Write a block of output lines to stdout in a single write."""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+
+class PlainTester(BaseTester):
     """
     Test runner for business scenarios with the Azure AI Agent.
     
@@ -32,272 +52,132 @@ class BusinessScenarioTester:
     
     def __init__(self):
         """Initialize the tester."""
-        self.logger = self._setup_logging()
-        self.agent = AzureAIFoundryAgent()
+        super().__init__()
         self.results: List[Dict[str, Any]] = []
     
-    def _setup_logging(self) -> logging.Logger:
-        """Setup detailed logging for demonstration."""
-        logger = logging.getLogger(__name__)
-        logger.setLevel(logging.INFO)
-        
-        if not logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter(
-                '%(asctime)s - %(levelname)s - %(message)s'
-            )
-            handler.setFormatter(formatter)
-            logger.addHandler(handler)
-            
-        return logger
-    
-    def _print_separator(self, title: str) -> None:
-        """Print a formatted separator for test sections."""
-        print(f"\n{'='*80}")
-        print(f"  {title}")
-        print(f"{'='*80}")
+    def _format_separator(self, out: List[str], title: str) -> None:
+        """Add a formatted separator for test sections to the output lines."""
+        out.append(f"\n{'='*80}")
+        out.append(f"  {title}")
+        out.append(f"{'='*80}")
     
-    def _print_result_summary(self, result: AgentResult, scenario_name: str) -> None:
-        """Print a detailed summary of the agent result."""
-        print(f"\n🎯 SCENARIO: {scenario_name}")
-        print(f"✅ Success: {result.success}")
-        print(f"⏱️  Execution Time: {result.execution_time_seconds:.2f} seconds")
-        print(f"🔢 Total Steps: {result.total_steps}")
+    def _format_result_summary(self, out: List[str], result: "AgentResult", scenario_name: str) -> None:
+        """Add a detailed summary of the agent result to the output lines."""
+        out.append(f"\n🎯 SCENARIO: {scenario_name}")
+        out.append(f"✅ Success: {result.success}")
+        out.append(f"⏱️  Execution Time: {result.execution_time_seconds:.2f} seconds")
+        out.append(f"🔢 Total Steps: {result.total_steps}")
         
         if result.error_message:
-            print(f"❌ Error: {result.error_message}")
+            out.append(f"❌ Error: {result.error_message}")
         
-        print("\n📝 RECOMMENDATION:")
-        print(f"{result.recommendation}")
+        out.append("\n📝 RECOMMENDATION:")
+        out.append(f"{result.recommendation}")
         
-        print("\n🧠 REASONING:")
-        print(f"{result.reasoning}")
+        out.append("\n🧠 REASONING:")
+        out.append(f"{result.reasoning}")
         
-        print("\n🔍 EXECUTION STEPS:")
+        out.append("\n🔍 EXECUTION STEPS:")
         for step in result.steps:
-            print(f"  Step {step.step_number}: {step.action}")
-            print(f"    💭 Reasoning: {step.reasoning}")
+            out.append(f"  Step {step.step_number}: {step.action}")
+            out.append(f"    💭 Reasoning: {step.reasoning}")
             if step.mcp_tool_called:
-                print(f"    🔧 MCP Tool: {step.mcp_tool_called}")
-                print(f"    📋 Parameters: {step.mcp_tool_params}")
+                cached = " (cached)" if step.mcp_result_source == "cache" else ""
+                out.append(f"    🔧 MCP Tool: {step.mcp_tool_called}{cached}")
+                out.append(f"    📋 Parameters: {step.mcp_tool_params}")
                 if step.mcp_result:
                     # Truncate long results for readability
                     result_preview = step.mcp_result[:200] + "..." if len(step.mcp_result) > 200 else step.mcp_result
-                    print(f"    📊 Result: {result_preview}")
-            print()
-    
-    def test_scenario_1_unauthorized_product(self) -> None:
-        """
-        Test Scenario 1: Unauthorized Product Test
-        User: Bob (HR), Product: Laptop (Electronics)
-        Expected: Rejection with alternative suggestions
-        """
-        self._print_separator("SCENARIO 1: Unauthorized Product Test")
-        
-        result = self.agent.process_purchase_request(
-            user_id="bob-002",
-            product_request="I need a laptop for my work"
-        )
-        
-        self._print_result_summary(result, "Unauthorized Product Test")
-        
-        # Check if the agent correctly identified the policy violation
-        contains_policy_check = any("policy" in step.action.lower() for step in result.steps)
-        contains_rejection = any(word in result.recommendation.lower() for word in ["not allowed", "unauthorized", "cannot", "policy"])
-        
-        print("\n📊 SCENARIO ANALYSIS:")
-        print(f"  ✅ Policy Check Performed: {contains_policy_check}")
-        print(f"  ✅ Contains Rejection/Policy Message: {contains_rejection}")
-        
-        self.results.append({
-            "scenario": "unauthorized_product",
-            "user_id": "bob-002",
-            "request": "laptop",
-            "success": result.success,
-            "policy_check_performed": contains_policy_check,
-            "contains_rejection": contains_rejection,
-            "execution_time": result.execution_time_seconds,
-            "steps": result.total_steps
-        })
-    
-    def test_scenario_2_budget_exceeded(self) -> None:
-        """
-        Test Scenario 2: Budget Exceeded Test
-        User: Bob (HR), Product: Expensive Office Chair
-        Expected: Budget explanation with cheaper alternatives
-        """
-        self._print_separator("SCENARIO 2: Budget Exceeded Test")
-        
-        result = self.agent.process_purchase_request(
-            user_id="bob-002",
-            product_request="I need the most expensive ergonomic office chair available"
-        )
-        
-        self._print_result_summary(result, "Budget Exceeded Test")
-        
-        # Check if the agent checked budget constraints
-        contains_budget_check = any("budget" in step.action.lower() for step in result.steps)
-        contains_budget_message = any(word in result.recommendation.lower() for word in ["budget", "expensive", "cost", "cheaper", "alternative"])
-        
-        print("\n📊 SCENARIO ANALYSIS:")
-        print(f"  ✅ Budget Check Performed: {contains_budget_check}")
-        print(f"  ✅ Contains Budget/Cost Message: {contains_budget_message}")
-        
-        self.results.append({
-            "scenario": "budget_exceeded",
-            "user_id": "bob-002",
-            "request": "expensive chair",
-            "success": result.success,
-            "budget_check_performed": contains_budget_check,
-            "contains_budget_message": contains_budget_message,
-            "execution_time": result.execution_time_seconds,
-            "steps": result.total_steps
-        })
+                    out.append(f"    📊 Result: {result_preview}")
+            out.append("")
     
-    def test_scenario_3_multiple_suppliers(self) -> None:
-        """
-        Test Scenario 3: Multiple Suppliers Test
-        User: Alice (IT), Product: Laptop
-        Expected: Supplier comparison based on "fastest" strategy
+    def _emit(self, result: "AgentResult", scenario: Scenario) -> Dict[str, Any]:
         """
-        self._print_separator("SCENARIO 3: Multiple Suppliers Test")
-        
-        result = self.agent.process_purchase_request(
-            user_id="alice-001",
-            product_request="I need a business laptop for development work"
-        )
-        
-        self._print_result_summary(result, "Multiple Suppliers Test")
-        
-        # Check if the agent compared suppliers and applied strategy
-        contains_supplier_check = any("supplier" in step.action.lower() for step in result.steps)
-        contains_strategy_application = any(word in result.recommendation.lower() for word in ["fastest", "delivery", "speed", "quick"])
+        Print a scenario's result and analysis, and return its summary record.
         
-        print("\n📊 SCENARIO ANALYSIS:")
-        print(f"  ✅ Supplier Check Performed: {contains_supplier_check}")
-        print(f"  ✅ Strategy Applied (fastest): {contains_strategy_application}")
-        
-        self.results.append({
-            "scenario": "multiple_suppliers",
-            "user_id": "alice-001",
-            "request": "business laptop",
-            "success": result.success,
-            "supplier_check_performed": contains_supplier_check,
-            "strategy_applied": contains_strategy_application,
-            "execution_time": result.execution_time_seconds,
-            "steps": result.total_steps
-        })
-    
-    def test_scenario_4_equivalent_product(self) -> None:
-        """
-        Test Scenario 4: Equivalent Product Test
-        User: Alice (IT), Search: "Computer"
-        Expected: Finds "Laptop" as equivalent
+        Output is collected and written in one call once the run completes, so
+        concurrently running scenarios do not interleave and a piped stdout sees
+        one write per scenario instead of one per line.
         """
-        self._print_separator("SCENARIO 4: Equivalent Product Test")
-        
-        result = self.agent.process_purchase_request(
-            user_id="alice-001",
-            product_request="I need a computer for software development"
-        )
+        out: List[str] = []
+        self._format_separator(out, f"SCENARIO {scenario.number}: {scenario.title}")
+        self._format_result_summary(out, result, scenario.title)
         
-        self._print_result_summary(result, "Equivalent Product Test")
+        action_found, recommendation_matched = analyze(result, scenario)
         
-        # Check if the agent found equivalent products
-        contains_product_search = any("search" in step.action.lower() for step in result.steps)
-        contains_laptop_match = any(word in result.recommendation.lower() for word in ["laptop", "computer", "found"])
+        out.append("\n📊 SCENARIO ANALYSIS:")
+        out.append(f"  ✅ {scenario.action_label}: {action_found}")
+        out.append(f"  ✅ {scenario.recommendation_label}: {recommendation_matched}")
+        _write_lines(out)
         
-        print("\n📊 SCENARIO ANALYSIS:")
-        print(f"  ✅ Product Search Performed: {contains_product_search}")
-        print(f"  ✅ Found Equivalent (laptop): {contains_laptop_match}")
-        
-        self.results.append({
-            "scenario": "equivalent_product",
-            "user_id": "alice-001",
-            "request": "computer",
+        return {
+            "scenario": scenario.key,
+            "user_id": scenario.user_id,
+            "request": scenario.request_summary,
             "success": result.success,
-            "product_search_performed": contains_product_search,
-            "found_equivalent": contains_laptop_match,
+            scenario.action_field: action_found,
+            scenario.recommendation_field: recommendation_matched,
             "execution_time": result.execution_time_seconds,
             "steps": result.total_steps
-        })
+        }
     
-    def test_scenario_5_successful_purchase(self) -> None:
-        """
-        Test Scenario 5: Successful Purchase Test
-        User: Carol (Marketing), Product: Marketing Materials
-        Expected: Successful recommendation with audit trail
-        """
-        self._print_separator("SCENARIO 5: Successful Purchase Test")
-        
-        result = self.agent.process_purchase_request(
-            user_id="carol-003",
-            product_request="I need professional notebooks for marketing campaigns"
-        )
-        
-        self._print_result_summary(result, "Successful Purchase Test")
-        
-        # Check if the agent completed the full workflow including audit
-        contains_audit = any("audit" in step.action.lower() for step in result.steps)
-        contains_success_message = any(word in result.recommendation.lower() for word in ["recommend", "approved", "suggest", "purchase"])
-        
-        print("\n📊 SCENARIO ANALYSIS:")
-        print(f"  ✅ Audit Record Created: {contains_audit}")
-        print(f"  ✅ Contains Success/Recommendation: {contains_success_message}")
-        
-        self.results.append({
-            "scenario": "successful_purchase",
-            "user_id": "carol-003",
-            "request": "professional notebooks",
-            "success": result.success,
-            "audit_created": contains_audit,
-            "contains_success": contains_success_message,
-            "execution_time": result.execution_time_seconds,
-            "steps": result.total_steps
-        })
+    def _fail(self, scenario: Scenario, error: BaseException) -> None:
+        """Report a scenario that raised instead of returning a result."""
+        super()._fail(scenario, error)
+        print(f"\n❌ Scenario {scenario.number} ({scenario.title}) failed with error: {error}")
     
     def _print_overall_summary(self) -> None:
         """Print an overall summary of all test results."""
-        self._print_separator("OVERALL TEST SUMMARY")
+        out: List[str] = []
+        self._format_separator(out, "OVERALL TEST SUMMARY")
         
+        # Totals are accumulated in one pass over the results
         total_scenarios = len(self.results)
-        successful_scenarios = sum(1 for r in self.results if r["success"])
-        total_execution_time = sum(r["execution_time"] for r in self.results)
-        total_steps = sum(r["steps"] for r in self.results)
-        
-        print("📊 EXECUTION STATISTICS:")
-        print(f"  Total Scenarios: {total_scenarios}")
-        print(f"  Successful Executions: {successful_scenarios}/{total_scenarios}")
-        print(f"  Total Execution Time: {total_execution_time:.2f} seconds")
-        print(f"  Average Time per Scenario: {total_execution_time/total_scenarios:.2f} seconds")
-        print(f"  Total Steps Executed: {total_steps}")
-        print(f"  Average Steps per Scenario: {total_steps/total_scenarios:.1f}")
-        
-        print("\n🎯 SCENARIO-SPECIFIC RESULTS:")
+        successful_scenarios = total_steps = 0
+        total_execution_time = 0.0
+        for r in self.results:
+            successful_scenarios += r["success"]
+            total_execution_time += r["execution_time"]
+            total_steps += r["steps"]
+        
+        out.append("📊 EXECUTION STATISTICS:")
+        out.append(f"  Total Scenarios: {total_scenarios}")
+        out.append(f"  Successful Executions: {successful_scenarios}/{total_scenarios}")
+        out.append(f"  Total Execution Time: {total_execution_time:.2f} seconds")
+        out.append(f"  Average Time per Scenario: {total_execution_time/total_scenarios:.2f} seconds")
+        out.append(f"  Total Steps Executed: {total_steps}")
+        out.append(f"  Average Steps per Scenario: {total_steps/total_scenarios:.1f}")
+        
+        out.append("\n🎯 SCENARIO-SPECIFIC RESULTS:")
         for result in self.results:
-            print(f"  {result['scenario']}: {'✅' if result['success'] else '❌'} "
-                  f"({result['execution_time']:.1f}s, {result['steps']} steps)")
+            out.append(f"  {result['scenario']}: {'✅' if result['success'] else '❌'} "
+                       f"({result['execution_time']:.1f}s, {result['steps']} steps)")
         
         # Save results to JSON for further analysis
-        results_file = Path(__file__).parent / f"test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(results_file, 'w') as f:
-            json.dump(self.results, f, indent=2, default=str)
-        
-        print(f"\n💾 Detailed results saved to: {results_file}")
+        # RESULTS_COMPRESS=1 gzips the file for archiving; level 1 keeps most of the
+        # size reduction at a fraction of the default level's CPU time
+        compress = os.getenv("RESULTS_COMPRESS") == "1"
+        suffix = ".json.gz" if compress else ".json"
+        results_file = Path(__file__).parent / f"test_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}"
+        partial_file = results_file.with_name(results_file.name + ".partial")
+        payload = _dumps_results(self.results)
+        with (gzip.open(partial_file, 'wb', compresslevel=1) if compress else open(partial_file, 'wb')) as f:
+            f.write(payload)
+        os.replace(partial_file, results_file)
+        
+        out.append(f"\n💾 Detailed results saved to: {results_file}")
+        _write_lines(out)
     
-    def run_all_scenarios(self) -> None:
-        """Run all business scenario tests."""
+    async def run_all_scenarios(self) -> None:
+        """Run all business scenario tests concurrently."""
         print("🚀 Starting Azure AI Agent Business Scenario Tests")
         print(f"Timestamp: {datetime.now()}")
         
         try:
-            self.test_scenario_1_unauthorized_product()
-            self.test_scenario_2_budget_exceeded() 
-            self.test_scenario_3_multiple_suppliers()
-            self.test_scenario_4_equivalent_product()
-            self.test_scenario_5_successful_purchase()
+            self.results = await self.run_scenarios()
             
-            self._print_overall_summary()
+            if self.results:
+                self._print_overall_summary()
             
         except Exception as e:
             self.logger.error(f"Error during testing: {e}", exc_info=True)
@@ -318,8 +198,8 @@ def main():
         print(f"Please create {env_file} based on .env.example")
         return
     
-    tester = BusinessScenarioTester()
-    tester.run_all_scenarios()
+    tester = PlainTester()
+    asyncio.run(tester.run_all_scenarios())
 
 
 if __name__ == "__main__":
@@ -10,41 +10,168 @@ Usage:
     uv run python tests/demo_azure_ai_agent_markdown.py
 """
 
-import sys
+import asyncio
 import json
-import logging
+import os
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from string import Template
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
 
-# Add parent directory to path for imports
-sys.path.append(str(Path(__file__).parent.parent))
+from scenarios import BaseTester, Scenario, error_result
 
-from azure_ai_agent import AzureAIFoundryAgent, AgentResult
+if TYPE_CHECKING:
+    from azure_ai_agent import AgentResult, AgentStep
+
+try:
+    import orjson
+except ImportError:  # optional speedup, installed with the 'fast' extra
+    orjson = None
+
+
+# Fixed report sections, parsed once at import instead of re-spelled for every report
+_HEADER = Template("""# $scenario - $mode Mode
+
+**Execution Date:** $date  
+**Mode:** $mode  
+**User ID:** `$user_id`  
+**Request:** "$user_request"  
+
+---
+
+## 🔍 Detailed Execution Log
+
+""")
+
+_EXECUTIVE_SUMMARY = Template("""## 📋 Executive Summary
+
+**Status:** $status  
+**Execution Time:** $execution_time seconds  
+**Total Steps:** $total_steps  
+
+**Final Recommendation:**
+$recommendation
+
+**Agent Reasoning:**
+$reasoning
+
+$error_heading
+$error_message
+
+---
+
+""")
+
+_TOOLS_TABLE_HEADER = """## 🛠️ MCP Tools Usage Summary
+
+| Step | Tool | Parameters | Status |
+|------|------|------------|---------|
+"""
+
+_PERFORMANCE_METRICS = Template("""## 📊 Performance Metrics
+
+- **Total Execution Time:** $execution_time seconds
+- **Steps Executed:** $total_steps
+- **MCP Tool Calls:** $tool_calls
+- **Average Time per Step:** $time_per_step seconds
+- **Success Rate:** $success_rate
+
+""")
+
+_TECHNICAL_DETAILS = Template("""## 🔧 Technical Details
+
+**Agent Mode:** $mode  
+**Implementation:** Azure AI Foundry Agent Service  
+**MCP Server:** Business Data Server  
+**Model:** GPT-4o (via Azure AI Foundry)  
+
+""")
+
+# Tokens (placeholder for future implementation)
+_REPORT_FOOTER = """## 💰 Token Usage
+
+*Token usage metrics will be implemented in future versions*
+
+**Estimated Costs:**
+- Input Tokens: N/A
+- Output Tokens: N/A  
+- Total Cost: N/A
+
+---
+
+*Report generated by Azure AI Agent Business Scenario Tester*
+"""
+
+
+def _format_time(timestamp: Optional[datetime]) -> str:
+    """Format a timestamp as HH:MM:SS using the C-coded isoformat rather than strftime."""
+    return timestamp.isoformat(timespec='seconds')[11:19] if timestamp else 'N/A'
+
+
+def _dumps_indented(obj: Any) -> str:
+    """Serialize to indented JSON for report code blocks."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str).decode()
+    return json.dumps(obj, indent=2, default=str)
+
+
+def _dumps_compact(obj: Any) -> str:
+    """Serialize to single-line JSON for report table cells."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode()
+    return json.dumps(obj, separators=(",", ":"), default=str)
 
 
 class MarkdownLogger:
-    """Enhanced logger that captures agent execution details for markdown reports."""
+    """
+    Writes a scenario's markdown report incrementally while the agent runs.
+    
+    The header is written when the logger is created, each step is appended as soon
+    as the agent reports it, and the summary is written by ``finalize``.
+    """
     
-    def __init__(self, scenario_name: str, mode: str = "azureai"):
+    def __init__(self, scenario_name: str, mode: str, filepath: Path,
+                 user_request: str, user_id: str):
         self.scenario_name = scenario_name
         self.mode = mode
+        self.filepath = filepath
         self.logs = []
         self.start_time = datetime.now()
+        # Durations use a monotonic clock, immune to wall-clock adjustments
+        self._start_counter = time.perf_counter()
         self.mcp_tool_calls = []
+        # Steps stream into a partial file that replaces the report once it is complete,
+        # so readers never see a half-written report under the final name
+        self._partial_path = filepath.with_name(filepath.name + ".partial")
+        self._file = open(self._partial_path, 'w', encoding='utf-8')
+        self._write(_HEADER.substitute(
+            scenario=self.scenario_name,
+            mode=self.mode.upper(),
+            date=self.start_time.strftime('%Y-%m-%d %H:%M:%S'),
+            user_id=user_id,
+            user_request=user_request
+        ))
+    
+    def _write(self, text: str) -> None:
+        """Append text to the report and flush it so progress is visible immediately."""
+        self._file.write(text)
+        self._file.flush()
         
     def log_step(self, step_number: int, action: str, reasoning: str, 
                  tool_called: Optional[str] = None, tool_params: Optional[Dict] = None,
-                 tool_result: Optional[str] = None):
+                 tool_result: Optional[str] = None, tool_result_source: Optional[str] = None,
+                 timestamp: Optional[datetime] = None):
         """Log a step in the agent execution."""
         step_info = {
             "step_number": step_number,
-            "timestamp": datetime.now(),
+            "timestamp": timestamp or datetime.now(),
             "action": action,
             "reasoning": reasoning,
             "tool_called": tool_called,
             "tool_params": tool_params,
-            "tool_result": tool_result
+            "tool_result": tool_result,
+            "tool_result_source": tool_result_source
         }
         self.logs.append(step_info)
         
@@ -53,303 +180,134 @@ class MarkdownLogger:
                 "tool": tool_called,
                 "params": tool_params,
                 "result": tool_result,
+                "source": tool_result_source,
                 "step": step_number
             })
     
-    def generate_markdown_report(self, result: AgentResult, user_request: str, 
-                               user_id: str) -> str:
-        """Generate a comprehensive markdown report."""
-        
-        execution_time = (datetime.now() - self.start_time).total_seconds()
-        
-        # Header
-        report = f"""# {self.scenario_name} - {self.mode.upper()} Mode
-
-**Execution Date:** {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}  
-**Mode:** {self.mode.upper()}  
-**User ID:** `{user_id}`  
-**Request:** "{user_request}"  
-**Status:** {'✅ SUCCESS' if result.success else '❌ FAILED'}  
-**Execution Time:** {execution_time:.2f} seconds  
-**Total Steps:** {result.total_steps}  
-
----
-
-## 📋 Executive Summary
-
-**Final Recommendation:**
-{result.recommendation}
-
-**Agent Reasoning:**
-{result.reasoning}
-
-{"**Error Details:**" if result.error_message else ""}
-{result.error_message if result.error_message else ""}
-
----
-
-## 🔍 Detailed Execution Log
-
-"""
+    def append_step(self, step: "AgentStep") -> None:
+        """Record a step and append its section to the report; used as the agent's ``on_step`` callback."""
+        # Steps arrive as they happen, so the arrival time stands in for an unset timestamp
+        timestamp = step.timestamp or datetime.now()
+        self.log_step(step.step_number, step.action, step.reasoning, step.mcp_tool_called,
+                      step.mcp_tool_params, step.mcp_result, step.mcp_result_source, timestamp)
         
-        # Step-by-step execution
-        for i, step in enumerate(result.steps, 1):
-            report += f"""### Step {step.step_number}: {step.action}
+        parts = [f"""### Step {step.step_number}: {step.action}
 
-**Timestamp:** {step.timestamp.strftime('%H:%M:%S') if step.timestamp else 'N/A'}  
+**Timestamp:** {_format_time(timestamp)}  
 **Reasoning:** {step.reasoning}  
 
-"""
-            
-            if step.mcp_tool_called:
-                report += f"""**🔧 MCP Tool Called:** `{step.mcp_tool_called}`  
+"""]
+        
+        if step.mcp_tool_called:
+            parts.append(f"""**🔧 MCP Tool Called:** `{step.mcp_tool_called}`  
+{f"**Result Source:** {step.mcp_result_source}  " if step.mcp_result_source else ""}
 **Parameters:** 
 ```json
-{json.dumps(step.mcp_tool_params, indent=2) if step.mcp_tool_params else 'None'}
+{_dumps_indented(step.mcp_tool_params) if step.mcp_tool_params else 'None'}
 ```
 
-"""
+""")
+            
+            if step.mcp_result:
+                # Truncate very long results for readability
+                result_text = step.mcp_result
+                if len(result_text) > 500:
+                    result_text = result_text[:500] + "... (truncated)"
                 
-                if step.mcp_result:
-                    # Truncate very long results for readability
-                    result_text = step.mcp_result
-                    if len(result_text) > 500:
-                        result_text = result_text[:500] + "... (truncated)"
-                    
-                    report += f"""**Tool Response:**
+                parts.append(f"""**Tool Response:**
 ```
 {result_text}
 ```
 
-"""
-            
-            report += "---\n\n"
+""")
+        
+        parts.append("---\n\n")
+        self._write("".join(parts))
+    
+    def finalize(self, result: "AgentResult") -> Path:
+        """Write the summary sections, close the report and return its path."""
+        
+        execution_time = time.perf_counter() - self._start_counter
+        
+        # Sections are collected and joined once instead of growing one string.
+        # The summary is written last because it depends on the final result.
+        parts = [_EXECUTIVE_SUMMARY.substitute(
+            status='✅ SUCCESS' if result.success else '❌ FAILED',
+            execution_time=f"{execution_time:.2f}",
+            total_steps=result.total_steps,
+            recommendation=result.recommendation,
+            reasoning=result.reasoning,
+            error_heading="**Error Details:**" if result.error_message else "",
+            error_message=result.error_message or ""
+        )]
         
         # MCP Tools Summary
         if self.mcp_tool_calls:
-            report += """## 🛠️ MCP Tools Usage Summary
-
-| Step | Tool | Parameters | Status |
-|------|------|------------|---------|
-"""
+            parts.append(_TOOLS_TABLE_HEADER)
             for call in self.mcp_tool_calls:
-                params_summary = json.dumps(call['params'])[:50] + "..." if call['params'] and len(json.dumps(call['params'])) > 50 else json.dumps(call['params'])
+                params_str = _dumps_compact(call['params'])
+                params_summary = params_str[:50] + "..." if call['params'] and len(params_str) > 50 else params_str
                 status = "✅ Success" if call['result'] else "❌ Error"
-                report += f"| {call['step']} | `{call['tool']}` | `{params_summary}` | {status} |\n"
+                parts.append(f"| {call['step']} | `{call['tool']}` | `{params_summary}` | {status} |\n")
             
-            report += "\n---\n\n"
-        
-        # Performance Metrics
-        report += f"""## 📊 Performance Metrics
-
-- **Total Execution Time:** {execution_time:.2f} seconds
-- **Steps Executed:** {result.total_steps}
-- **MCP Tool Calls:** {len(self.mcp_tool_calls)}
-- **Average Time per Step:** {execution_time / result.total_steps:.2f} seconds
-- **Success Rate:** {'100%' if result.success else '0%'}
-
-"""
+            parts.append("\n---\n\n")
         
-        # Technical Details
-        report += f"""## 🔧 Technical Details
-
-**Agent Mode:** {self.mode.upper()}  
-**Implementation:** Azure AI Foundry Agent Service  
-**MCP Server:** Business Data Server  
-**Model:** GPT-4o (via Azure AI Foundry)  
-
-"""
-        
-        # Tokens (placeholder for future implementation)
-        report += """## 💰 Token Usage
-
-*Token usage metrics will be implemented in future versions*
-
-**Estimated Costs:**
-- Input Tokens: N/A
-- Output Tokens: N/A  
-- Total Cost: N/A
-
----
-
-*Report generated by Azure AI Agent Business Scenario Tester*
-"""
+        parts.append(_PERFORMANCE_METRICS.substitute(
+            execution_time=f"{execution_time:.2f}",
+            total_steps=result.total_steps,
+            tool_calls=len(self.mcp_tool_calls),
+            time_per_step=f"{execution_time / result.total_steps if result.total_steps else 0:.2f}",
+            success_rate='100%' if result.success else '0%'
+        ))
+        parts.append(_TECHNICAL_DETAILS.substitute(mode=self.mode.upper()))
+        parts.append(_REPORT_FOOTER)
         
-        return report
+        self._write("".join(parts))
+        self._file.close()
+        os.replace(self._partial_path, self.filepath)
+        return self.filepath
 
 
-class BusinessScenarioTester:
+class MarkdownTester(BaseTester):
     """Enhanced tester with markdown logging capabilities."""
     
-    def __init__(self, mode: str = "azureai"):
+    def __init__(self, mode: str = "azureai", concurrency: Optional[int] = None):
         self.mode = mode.lower()
-        self.logger = self._setup_logging()
-        self.agent = AzureAIFoundryAgent()
+        super().__init__(use_mcp=self.mode != "azureai-direct", concurrency=concurrency)
         self.results_dir = Path(__file__).parent.parent / "results"
         self.results_dir.mkdir(exist_ok=True)
-        
-    def _setup_logging(self) -> logging.Logger:
-        """Setup logging for the tester."""
-        logger = logging.getLogger(__name__)
-        logger.setLevel(logging.INFO)
-        
-        if not logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-            handler.setFormatter(formatter)
-            logger.addHandler(handler)
-            
-        return logger
-    
-    def _save_markdown_report(self, scenario_number: int, report: str):
-        """Save the markdown report to the results directory."""
-        filename = f"{self.mode}-scenario{scenario_number}.md"
-        filepath = self.results_dir / filename
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(report)
-        
-        self.logger.info(f"📄 Report saved: {filepath}")
-        return filepath
-    
-    def test_scenario_1_unauthorized_product(self) -> None:
-        """Test Scenario 1: Unauthorized Product Test"""
-        scenario_name = "Scenario 1: Unauthorized Product Access"
-        user_id = "bob-002"
-        user_request = "I need a laptop for my work"
-        
-        print(f"\n🧪 Testing: {scenario_name}")
-        print(f"👤 User: {user_id} | Request: {user_request}")
-        
-        markdown_logger = MarkdownLogger(scenario_name, self.mode)
-        
-        try:
-            result = self.agent.process_purchase_request(user_id, user_request)
-            
-            # Generate and save report
-            report = markdown_logger.generate_markdown_report(result, user_request, user_id)
-            filepath = self._save_markdown_report(1, report)
-            
-            # Quick summary
-            status = "✅ SUCCESS" if result.success else "❌ FAILED"
-            print(f"📊 Result: {status} | Time: {result.execution_time_seconds:.1f}s | Steps: {result.total_steps}")
-            print(f"📄 Report: {filepath}")
-            
-        except Exception as e:
-            self.logger.error(f"❌ Scenario 1 failed: {e}")
-            
-            # Create error report
-            error_result = AgentResult(
-                success=False,
-                recommendation="Test failed due to unexpected error",
-                reasoning=f"Error occurred: {str(e)}",
-                total_steps=0,
-                execution_time_seconds=0.0,
-                steps=[],
-                error_message=str(e)
-            )
-            
-            report = markdown_logger.generate_markdown_report(error_result, user_request, user_id)
-            self._save_markdown_report(1, report)
-    
-    def test_scenario_2_budget_exceeded(self) -> None:
-        """Test Scenario 2: Budget Exceeded Test"""
-        scenario_name = "Scenario 2: Budget Constraints"
-        user_id = "bob-002"
-        user_request = "I need the most expensive ergonomic office chair available"
-        
-        print(f"\n🧪 Testing: {scenario_name}")
-        print(f"👤 User: {user_id} | Request: {user_request}")
-        
-        markdown_logger = MarkdownLogger(scenario_name, self.mode)
-        
-        try:
-            result = self.agent.process_purchase_request(user_id, user_request)
-            
-            report = markdown_logger.generate_markdown_report(result, user_request, user_id)
-            filepath = self._save_markdown_report(2, report)
-            
-            status = "✅ SUCCESS" if result.success else "❌ FAILED"
-            print(f"📊 Result: {status} | Time: {result.execution_time_seconds:.1f}s | Steps: {result.total_steps}")
-            print(f"📄 Report: {filepath}")
-            
-        except Exception as e:
-            self.logger.error(f"❌ Scenario 2 failed: {e}")
+        self._reports: Dict[int, MarkdownLogger] = {}
     
-    def test_scenario_3_multiple_suppliers(self) -> None:
-        """Test Scenario 3: Multiple Suppliers Test"""
-        scenario_name = "Scenario 3: Supplier Comparison"
-        user_id = "alice-001"
-        user_request = "I need a business laptop for development work"
-        
-        print(f"\n🧪 Testing: {scenario_name}")
-        print(f"👤 User: {user_id} | Request: {user_request}")
+    def _begin(self, scenario: Scenario) -> Callable[["AgentStep"], None]:
+        """Open the scenario's report and stream steps into it as they happen."""
+        print(f"\n🧪 Testing: {scenario.report_title}")
+        print(f"👤 User: {scenario.user_id} | Request: {scenario.request}")
         
-        markdown_logger = MarkdownLogger(scenario_name, self.mode)
-        
-        try:
-            result = self.agent.process_purchase_request(user_id, user_request)
-            
-            report = markdown_logger.generate_markdown_report(result, user_request, user_id)
-            filepath = self._save_markdown_report(3, report)
-            
-            status = "✅ SUCCESS" if result.success else "❌ FAILED"
-            print(f"📊 Result: {status} | Time: {result.execution_time_seconds:.1f}s | Steps: {result.total_steps}")
-            print(f"📄 Report: {filepath}")
-            
-        except Exception as e:
-            self.logger.error(f"❌ Scenario 3 failed: {e}")
+        filepath = self.results_dir / f"{self.mode}-scenario{scenario.number}.md"
+        markdown_logger = MarkdownLogger(scenario.report_title, self.mode, filepath, scenario.request, scenario.user_id)
+        self._reports[scenario.number] = markdown_logger
+        return markdown_logger.append_step
     
-    def test_scenario_4_equivalent_product(self) -> None:
-        """Test Scenario 4: Equivalent Product Test"""
-        scenario_name = "Scenario 4: Product Search Intelligence"
-        user_id = "alice-001"
-        user_request = "I need a computer for software development"
-        
-        print(f"\n🧪 Testing: {scenario_name}")
-        print(f"👤 User: {user_id} | Request: {user_request}")
-        
-        markdown_logger = MarkdownLogger(scenario_name, self.mode)
+    def _emit(self, result: "AgentResult", scenario: Scenario) -> Path:
+        """Finish the scenario's report and print a quick summary."""
+        filepath = self._reports.pop(scenario.number).finalize(result)
+        self.logger.info(f"📄 Report saved: {filepath}")
         
-        try:
-            result = self.agent.process_purchase_request(user_id, user_request)
-            
-            report = markdown_logger.generate_markdown_report(result, user_request, user_id)
-            filepath = self._save_markdown_report(4, report)
-            
-            status = "✅ SUCCESS" if result.success else "❌ FAILED"
-            print(f"📊 Result: {status} | Time: {result.execution_time_seconds:.1f}s | Steps: {result.total_steps}")
-            print(f"📄 Report: {filepath}")
-            
-        except Exception as e:
-            self.logger.error(f"❌ Scenario 4 failed: {e}")
+        status = "✅ SUCCESS" if result.success else "❌ FAILED"
+        print(f"📊 Result: {status} | Time: {result.execution_time_seconds:.1f}s | Steps: {result.total_steps}")
+        print(f"📄 Report: {filepath}")
+        return filepath
     
-    def test_scenario_5_successful_purchase(self) -> None:
-        """Test Scenario 5: Successful Purchase Test"""
-        scenario_name = "Scenario 5: Complete Purchase Workflow"
-        user_id = "carol-003"
-        user_request = "I need professional notebooks for marketing campaigns"
-        
-        print(f"\n🧪 Testing: {scenario_name}")
-        print(f"👤 User: {user_id} | Request: {user_request}")
-        
-        markdown_logger = MarkdownLogger(scenario_name, self.mode)
+    def _fail(self, scenario: Scenario, error: BaseException) -> None:
+        """Close the scenario's report with an error summary."""
+        super()._fail(scenario, error)
         
-        try:
-            result = self.agent.process_purchase_request(user_id, user_request)
-            
-            report = markdown_logger.generate_markdown_report(result, user_request, user_id)
-            filepath = self._save_markdown_report(5, report)
-            
-            status = "✅ SUCCESS" if result.success else "❌ FAILED"
-            print(f"📊 Result: {status} | Time: {result.execution_time_seconds:.1f}s | Steps: {result.total_steps}")
-            print(f"📄 Report: {filepath}")
-            
-        except Exception as e:
-            self.logger.error(f"❌ Scenario 5 failed: {e}")
+        markdown_logger = self._reports.pop(scenario.number, None)
+        if markdown_logger is not None:
+            markdown_logger.finalize(error_result(error))
     
-    def run_all_scenarios(self) -> None:
-        """Run all business scenario tests with markdown logging."""
+    async def run_all_scenarios(self) -> None:
+        """Run all business scenario tests concurrently with markdown logging."""
         print("🚀 Azure AI Agent Business Scenario Testing")
         print("=" * 60)
         print(f"Mode: {self.mode.upper()}")
@@ -357,11 +315,8 @@ class BusinessScenarioTester:
         print(f"Results Directory: {self.results_dir}")
         
         try:
-            self.test_scenario_1_unauthorized_product()
-            self.test_scenario_2_budget_exceeded()
-            self.test_scenario_3_multiple_suppliers()
-            self.test_scenario_4_equivalent_product()
-            self.test_scenario_5_successful_purchase()
+            # Each scenario writes its own report, so they can all run at once
+            await self.run_scenarios()
             
             print("\n✅ All scenarios completed!")
             print(f"📁 Reports saved to: {self.results_dir}")
@@ -377,8 +332,10 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='Run Azure AI Agent business scenarios with markdown logging')
-    parser.add_argument('--mode', choices=['azureai', 'langchain', 'semantickernel'], 
+    parser.add_argument('--mode', choices=['azureai', 'azureai-direct', 'langchain', 'semantickernel'], 
                        default='azureai', help='Agent implementation mode')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='Scenarios running at once (default: AGENT_CONCURRENCY or 3)')
     args = parser.parse_args()
     
     print("Azure AI Agent Business Scenario Testing with Markdown Logging")
@@ -391,12 +348,12 @@ def main():
         print(f"Please create {env_file} based on .env.example")
         return
     
-    if args.mode != 'azureai':
+    if args.mode not in ('azureai', 'azureai-direct'):
         print(f"⚠️  Mode '{args.mode}' not yet implemented. Using 'azureai' mode.")
         args.mode = 'azureai'
     
-    tester = BusinessScenarioTester(args.mode)
-    tester.run_all_scenarios()
+    tester = MarkdownTester(args.mode, args.concurrency)
+    asyncio.run(tester.run_all_scenarios())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,259 @@
+"""
+Business scenarios from Design.md and the shared runner for the demo scripts.
+
+Both demos run the same table of scenarios against one shared agent; they differ
+only in how each result is reported.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Pattern, Tuple
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Scenarios running at once, bounding concurrent runs against the model deployment
+DEFAULT_CONCURRENCY = 3
+
+if TYPE_CHECKING:
+    # The agent module pulls in the Azure SDK and identity stack, so it is only
+    # imported at runtime once a tester is actually created
+    from azure_ai_agent import AgentResult, AgentStep
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    """A business scenario and the signals that indicate the expected outcome."""
+    number: int
+    key: str
+    title: str
+    report_title: str
+    user_id: str
+    request: str
+    request_summary: str
+    expected: str
+    action_keyword: str
+    action_label: str
+    action_field: str
+    recommendation_pattern: Pattern[str]
+    recommendation_label: str
+    recommendation_field: str
+
+
+SCENARIOS: Tuple[Scenario, ...] = (
+    Scenario(
+        number=1,
+        key="unauthorized_product",
+        title="Unauthorized Product Test",
+        report_title="Scenario 1: Unauthorized Product Access",
+        user_id="bob-002",
+        request="I need a laptop for my work",
+        request_summary="laptop",
+        expected="Bob (HR) asks for a laptop (electronics); rejection with alternative suggestions",
+        action_keyword="policy",
+        action_label="Policy Check Performed",
+        action_field="policy_check_performed",
+        recommendation_pattern=re.compile(r"not allowed|unauthorized|cannot|policy"),
+        recommendation_label="Contains Rejection/Policy Message",
+        recommendation_field="contains_rejection",
+    ),
+    Scenario(
+        number=2,
+        key="budget_exceeded",
+        title="Budget Exceeded Test",
+        report_title="Scenario 2: Budget Constraints",
+        user_id="bob-002",
+        request="I need the most expensive ergonomic office chair available",
+        request_summary="expensive chair",
+        expected="Bob (HR) asks for an expensive office chair; budget explanation with cheaper alternatives",
+        action_keyword="budget",
+        action_label="Budget Check Performed",
+        action_field="budget_check_performed",
+        recommendation_pattern=re.compile(r"budget|expensive|cost|cheaper|alternative"),
+        recommendation_label="Contains Budget/Cost Message",
+        recommendation_field="contains_budget_message",
+    ),
+    Scenario(
+        number=3,
+        key="multiple_suppliers",
+        title="Multiple Suppliers Test",
+        report_title="Scenario 3: Supplier Comparison",
+        user_id="alice-001",
+        request="I need a business laptop for development work",
+        request_summary="business laptop",
+        expected='Alice (IT) asks for a laptop; supplier comparison based on the "fastest" strategy',
+        action_keyword="supplier",
+        action_label="Supplier Check Performed",
+        action_field="supplier_check_performed",
+        recommendation_pattern=re.compile(r"fastest|delivery|speed|quick"),
+        recommendation_label="Strategy Applied (fastest)",
+        recommendation_field="strategy_applied",
+    ),
+    Scenario(
+        number=4,
+        key="equivalent_product",
+        title="Equivalent Product Test",
+        report_title="Scenario 4: Product Search Intelligence",
+        user_id="alice-001",
+        request="I need a computer for software development",
+        request_summary="computer",
+        expected='Alice (IT) searches for "computer"; finds "laptop" as an equivalent',
+        action_keyword="search",
+        action_label="Product Search Performed",
+        action_field="product_search_performed",
+        recommendation_pattern=re.compile(r"laptop|computer|found"),
+        recommendation_label="Found Equivalent (laptop)",
+        recommendation_field="found_equivalent",
+    ),
+    Scenario(
+        number=5,
+        key="successful_purchase",
+        title="Successful Purchase Test",
+        report_title="Scenario 5: Complete Purchase Workflow",
+        user_id="carol-003",
+        request="I need professional notebooks for marketing campaigns",
+        request_summary="professional notebooks",
+        expected="Carol (Marketing) asks for marketing materials; successful recommendation with audit trail",
+        action_keyword="audit",
+        action_label="Audit Record Created",
+        action_field="audit_created",
+        recommendation_pattern=re.compile(r"recommend|approved|suggest|purchase"),
+        recommendation_label="Contains Success/Recommendation",
+        recommendation_field="contains_success",
+    ),
+)
+
+
+def analyze(result: "AgentResult", scenario: Scenario) -> Tuple[bool, bool]:
+    """
+    Check a result for the scenario's expected step and recommendation signals.
+
+    Step actions and the recommendation are lowercased once per scenario instead of
+    once per step and keyword.
+
+    Returns:
+        Whether a step action mentions the scenario keyword, and whether the
+        recommendation matches the scenario pattern
+    """
+    actions = "\n".join(step.action for step in result.steps).lower()
+    return (
+        scenario.action_keyword in actions,
+        bool(scenario.recommendation_pattern.search(result.recommendation.lower()))
+    )
+
+
+def error_result(error: BaseException) -> "AgentResult":
+    """Build the failed result reported for a scenario that raised."""
+    from azure_ai_agent import AgentResult
+
+    return AgentResult(
+        success=False,
+        recommendation="Test failed due to unexpected error",
+        reasoning=f"Error occurred: {error}",
+        total_steps=0,
+        execution_time_seconds=0.0,
+        steps=[],
+        error_message=str(error)
+    )
+
+
+class BaseTester:
+    """
+    Runs all scenarios concurrently against one shared agent.
+
+    Subclasses report results by overriding ``_emit`` and, optionally, ``_begin`` to
+    follow steps while a scenario runs and ``_fail`` to report errors raised outside
+    the agent call. A scenario whose agent call raises is reported through ``_emit``
+    like any other, with an ``error_result``.
+    """
+
+    def __init__(self, use_mcp: bool = True, concurrency: Optional[int] = None):
+        """
+        Initialize the tester.
+
+        Args:
+            use_mcp: Passed to the agent; False selects the direct workflow mode
+            concurrency: Maximum number of scenarios running at once; defaults to the
+                AGENT_CONCURRENCY environment variable or ``DEFAULT_CONCURRENCY``
+        """
+        from azure_ai_agent import AzureAIFoundryAgent
+
+        self.logger = self._setup_logging()
+        self.agent = AzureAIFoundryAgent(use_mcp=use_mcp)
+        if concurrency is None:
+            concurrency = int(os.getenv("AGENT_CONCURRENCY", DEFAULT_CONCURRENCY))
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    def _setup_logging(self) -> logging.Logger:
+        """Setup logging for the tester."""
+        logger = logging.getLogger(type(self).__module__)
+        logger.setLevel(logging.INFO)
+
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+
+        return logger
+
+    def _begin(self, scenario: Scenario) -> Optional[Callable[["AgentStep"], None]]:
+        """Called before a scenario runs; may return an ``on_step`` callback."""
+        return None
+
+    def _emit(self, result: "AgentResult", scenario: Scenario) -> Any:
+        """Report a scenario's result; the return value is collected by ``run_scenarios``."""
+        raise NotImplementedError
+
+    def _fail(self, scenario: Scenario, error: BaseException) -> None:
+        """Report a scenario that raised instead of returning a result."""
+        self.logger.error(f"❌ Scenario {scenario.number} failed: {error}", exc_info=error)
+
+    async def _run_one(self, scenario: Scenario) -> Any:
+        """Run one scenario and report its result."""
+        async with self._semaphore:
+            on_step = self._begin(scenario)
+            try:
+                result = await self.agent.aprocess_purchase_request(
+                    scenario.user_id, scenario.request, on_step=on_step
+                )
+            except Exception as e:
+                self.logger.exception(f"❌ Scenario {scenario.number} failed")
+                result = error_result(e)
+        return self._emit(result, scenario)
+
+    async def run_scenarios(self) -> List[Any]:
+        """
+        Run every scenario concurrently and release the agent afterwards.
+
+        Each scenario is an independent agent run dominated by model latency, so
+        running them together takes as long as the slowest instead of the sum. At
+        most ``concurrency`` scenarios run at once to stay within the deployment's
+        rate limits.
+
+        Returns:
+            The values returned by ``_emit`` for the scenarios that completed, in
+            scenario order
+        """
+        try:
+            # One client, credential and agent are shared by all scenarios
+            await self.agent.aensure_ready()
+
+            outcomes = await asyncio.gather(
+                *(self._run_one(scenario) for scenario in SCENARIOS), return_exceptions=True
+            )
+        finally:
+            await self.agent.ashutdown()
+
+        emitted = []
+        for scenario, outcome in zip(SCENARIOS, outcomes):
+            if isinstance(outcome, BaseException):
+                self._fail(scenario, outcome)
+            else:
+                emitted.append(outcome)
+        return emitted
@@ -5,8 +5,9 @@ import os
 import asyncio
 from pathlib import Path
 from dotenv import load_dotenv
-from azure.ai.projects import AIProjectClient
-from azure.identity import DefaultAzureCredential
+from azure.ai.agents.models import ThreadMessageOptions
+from azure.ai.projects.aio import AIProjectClient
+from azure.identity.aio import DefaultAzureCredential
 
 async def test_basic_agent():
     """Test basic agent creation and usage."""
@@ -14,37 +15,29 @@ async def test_basic_agent():
     config_path = Path(__file__).parent.parent / ".env"
     load_dotenv(config_path)
     
-    # Create client
-    client = AIProjectClient(
-        endpoint=os.getenv("PROJECT_ENDPOINT"),
-        credential=DefaultAzureCredential()
-    )
-    
     try:
-        with client:
-            # Create simple agent
-            agent = client.agents.create_agent(
-                model=os.getenv("MODEL_DEPLOYMENT_NAME"),
-                name="test-agent",
-                instructions="You are a helpful assistant."
+        async with DefaultAzureCredential() as credential, AIProjectClient(
+            endpoint=os.getenv("PROJECT_ENDPOINT"),
+            credential=credential
+        ) as client:
+            # The agent and the thread (created with its first message) do not depend
+            # on each other, so both requests are in flight at once
+            agent, thread = await asyncio.gather(
+                client.agents.create_agent(
+                    model=os.getenv("MODEL_DEPLOYMENT_NAME"),
+                    name="test-agent",
+                    instructions="You are a helpful assistant."
+                ),
+                client.agents.threads.create(
+                    messages=[ThreadMessageOptions(role="user", content="Hello, what is 2+2?")]
+                )
             )
             
             print(f"Created agent: {agent.id}")
-            
-            # Create thread
-            thread = client.agents.threads.create()
-            print(f"Created thread: {thread.id}")
-            
-            # Add message
-            message = client.agents.messages.create(
-                thread_id=thread.id,
-                role="user",
-                content="Hello, what is 2+2?"
-            )
-            print(f"Created message: {message.id}")
+            print(f"Created thread with message: {thread.id}")
             
             # Run agent
-            run = client.agents.runs.create_and_process(
+            run = await client.agents.runs.create_and_process(
                 thread_id=thread.id,
                 agent_id=agent.id
             )
@@ -54,18 +47,23 @@ async def test_basic_agent():
             messages = client.agents.messages.list(thread_id=thread.id)
             print(f"Messages type: {type(messages)}")
             
-            # Try to iterate through messages
-            for msg in messages:
-                print(f"Message role: {msg.role}")
-                if msg.role == "assistant" and msg.content:
-                    for content in msg.content:
-                        if hasattr(content, 'text'):
-                            print(f"Response: {content.text.value}")
+            # Read the transcript while the agent is deleted
+            async def collect_messages():
+                return [msg async for msg in messages]
             
-            # Clean up
-            client.agents.delete_agent(agent.id)
-            print("Agent deleted")
+            transcript, _ = await asyncio.gather(collect_messages(), client.agents.delete_agent(agent.id))
+            
+            print(f"Message roles: {[msg.role for msg in transcript]}")
+            responses = (
+                content.text.value
+                for msg in transcript if msg.role == "assistant" and msg.content
+                for content in msg.content if getattr(content, "text", None)
+            )
+            for response in responses:
+                print(f"Response: {response}")
             
+            print("Agent deleted")
+    
     except Exception as e:
         print(f"Error: {e}")
         import traceback
@@ -0,0 +1,103 @@
+"""
+Unit tests for the direct-mode MCP tool result cache.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from mcp_client import MCPToolError, ToolResultCache
+
+
+class CountingTool:
+    """Stand-in for an MCP tool call that counts how often it runs."""
+
+    def __init__(self, result="result", error=None, delay=0.0):
+        self.calls = 0
+        self.result = result
+        self.error = error
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_lookups_share_one_call():
+    cache = ToolResultCache()
+    tool = CountingTool(delay=0.01)
+
+    async def lookup():
+        return await asyncio.gather(*(
+            cache.get_or_compute("get_user", {"user_id": "alice-001"}, tool) for _ in range(3)
+        ))
+
+    results = asyncio.run(lookup())
+    assert tool.calls == 1
+    assert [result for result, _ in results] == ["result"] * 3
+    assert sorted(cached for _, cached in results) == [False, True, True]
+
+
+def test_failed_calls_are_not_cached():
+    cache = ToolResultCache()
+    failing = CountingTool(error=MCPToolError("boom"))
+
+    async def lookup(compute):
+        return await cache.get_or_compute("get_user", {"user_id": "alice-001"}, compute)
+
+    with pytest.raises(MCPToolError):
+        asyncio.run(lookup(failing))
+    assert asyncio.run(lookup(CountingTool())) == ("result", False)
+
+
+def test_results_expire_after_ttl():
+    cache = ToolResultCache(default_ttl=0.05)
+    tool = CountingTool()
+
+    async def lookup():
+        return (await cache.get_or_compute("search_products", {"name": "laptop"}, tool))[1]
+
+    async def lookup_until_expired():
+        first, second = await lookup(), await lookup()
+        await asyncio.sleep(0.1)
+        return first, second, await lookup()
+
+    assert asyncio.run(lookup_until_expired()) == (False, True, False)
+    assert tool.calls == 2
+
+
+def test_department_budget_is_never_cached():
+    cache = ToolResultCache()
+    tool = CountingTool()
+
+    async def lookup():
+        return [
+            await cache.get_or_compute("get_department_budget", {"department_id": "IT"}, tool)
+            for _ in range(2)
+        ]
+
+    assert asyncio.run(lookup()) == [("result", False), ("result", False)]
+    assert tool.calls == 2
+
+
+def test_oldest_entry_is_evicted():
+    cache = ToolResultCache(max_entries=2)
+    tool = CountingTool()
+
+    async def lookup(*product_ids):
+        return [
+            (await cache.get_or_compute("get_product_details", {"product_id": product_id}, tool))[1]
+            for product_id in product_ids
+        ]
+
+    async def lookup_twice():
+        return await lookup("A", "B", "C"), await lookup("C", "B", "A")
+
+    assert asyncio.run(lookup_twice()) == ([False, False, False], [True, True, False])
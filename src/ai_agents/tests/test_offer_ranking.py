@@ -0,0 +1,59 @@
+"""
+Unit tests for the direct-mode offer ranking.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+import offer_ranking
+from offer_ranking import rank_offer_indices
+
+
+SUPPLIERS = {
+    "SUP001": {"reliability_score": 9.0},
+    "SUP002": {"reliability_score": 6.0},
+    "SUP003": {"reliability_score": 8.5},
+}
+
+OFFERS = [
+    {"supplier_id": "SUP001", "price": 5000.0},
+    {"supplier_id": "SUP002", "price": 100.0},
+    {"supplier_id": "SUP003", "price": 450.0},
+    {"supplier_id": "SUP002", "price": 120.0},
+    {"supplier_id": "SUP999", "price": 80.0},
+]
+
+
+def test_affordable_offers_rank_first():
+    ranking = rank_offer_indices(OFFERS, SUPPLIERS, budget=1000.0)
+    assert ranking[-1] == 0
+    assert set(ranking[:4]) == {1, 2, 3, 4}
+
+
+def test_zero_budget_ranks_every_offer_over_budget():
+    offers = [{"supplier_id": "SUP001", "price": 5000.0}, {"supplier_id": "SUP001", "price": 100.0}]
+    assert rank_offer_indices(offers, SUPPLIERS, budget=0.0) == [1, 0]
+    assert rank_offer_indices(offers, SUPPLIERS, budget=1.0) == [1, 0]
+    # With nothing affordable, the order matches a budget both offers exceed
+    assert rank_offer_indices(OFFERS, SUPPLIERS, budget=0.0) == rank_offer_indices(OFFERS, SUPPLIERS, budget=-50.0)
+
+
+def test_unknown_budget_weighs_reliability_against_price():
+    assert rank_offer_indices(OFFERS, SUPPLIERS, budget=None) == [2, 1, 3, 4, 0]
+
+
+def test_empty_offers():
+    assert rank_offer_indices([], SUPPLIERS, budget=100.0) == []
+
+
+@pytest.mark.parametrize("budget", [None, -10.0, 0.0, 150.0, 1000.0, 10000.0])
+def test_numba_and_python_rankings_match(monkeypatch, budget):
+    if offer_ranking.numba is None:
+        pytest.skip("Numba is not installed")
+    compiled = rank_offer_indices(OFFERS, SUPPLIERS, budget, qty=2)
+    monkeypatch.setattr(offer_ranking, "numba", None)
+    assert rank_offer_indices(OFFERS, SUPPLIERS, budget, qty=2) == compiled
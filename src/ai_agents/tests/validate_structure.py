@@ -7,19 +7,21 @@ Azure OpenAI credentials. Use this to verify the implementation before
 running the full demo.
 """
 
+import os
 import sys
 from pathlib import Path
 
+# Project root, resolved once for the import path and all checks
+BASE_PATH = Path(__file__).parent.parent
+
 # Add parent directory to path for imports
-sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(BASE_PATH))
 
 def validate_structure():
     """Validate the AI agents project structure."""
     print("🔍 Validating Azure AI Agent Structure")
     print("=" * 50)
     
-    base_path = Path(__file__).parent.parent
-    
     # Check required files
     required_files = [
         "azure_ai_agent.py",
@@ -27,13 +29,23 @@ def validate_structure():
         "pyproject.toml",
         "README.md",
         "tests/__init__.py",
-        "tests/demo_azure_ai_agent.py"
+        "tests/demo_azure_ai_agent.py",
+        "tests/scenarios.py"
     ]
     
+    # List each directory once with scandir instead of one stat call per file
+    present = set()
+    for directory in {file.rpartition("/")[0] for file in required_files}:
+        prefix = f"{directory}/" if directory else ""
+        try:
+            with os.scandir(BASE_PATH / directory) as entries:
+                present.update(prefix + entry.name for entry in entries)
+        except FileNotFoundError:
+            pass
+    
     missing_files = []
     for file in required_files:
-        file_path = base_path / file
-        if file_path.exists():
+        if file in present:
             print(f"✅ {file}")
         else:
             print(f"❌ {file}")
@@ -84,7 +96,7 @@ def validate_configuration():
     print("\n🔍 Validating Configuration")
     print("=" * 50)
     
-    env_example = Path(__file__).parent.parent / ".env.example"
+    env_example = BASE_PATH / ".env.example"
     
     if not env_example.exists():
         print("❌ .env.example not found")
@@ -0,0 +1,103 @@
+"""Append-only, batched persistence of audit records."""
+
+import json
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Deque, Optional, Union
+
+from models import AuditRecord
+
+try:
+    import orjson
+except ImportError:  # optional speedup, installed with the 'fast' extra
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL_SECONDS = 1.0
+
+
+def _dumps_line(record: AuditRecord) -> bytes:
+    """Serialize a record as one JSON line."""
+    data = record.model_dump(mode="json")
+    if orjson is not None:
+        return orjson.dumps(data) + b"\n"
+    return json.dumps(data, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class AuditLogWriter:
+    """Writes audit records to a JSON Lines file from a background thread.
+
+    Creating a record only enqueues it. The writer thread drains the queue every
+    ``flush_interval`` seconds, or as soon as ``batch_size`` records are waiting, and
+    appends the whole batch with a single write. The file is opened in append mode,
+    so several server processes can share one log.
+    """
+
+    def __init__(self, path: Union[str, Path], batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS):
+        """Start the writer thread.
+
+        Args:
+            path: JSON Lines file the records are appended to
+            batch_size: Number of queued records that triggers an early flush
+            flush_interval: Maximum time in seconds a record waits before it is written
+        """
+        self.path = Path(path)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: Deque[AuditRecord] = deque()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, record: AuditRecord) -> None:
+        """Queue a record for the next batch, or write it at once after ``close``."""
+        self._queue.append(record)
+        if self._closed:
+            # No writer thread is left to pick the record up
+            self._flush()
+        elif len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def close(self) -> None:
+        """Write any queued records and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        if self._queue:
+            logger.error("%s audit records could not be written to %s before closing",
+                         len(self._queue), self.path)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._flush()
+        self._flush()
+
+    def _flush(self) -> None:
+        """Append all queued records to the log in one write.
+
+        A batch that cannot be written is put back at the head of the queue, so it is
+        retried with the next flush instead of being lost.
+        """
+        batch = []
+        while self._queue:
+            batch.append(self._queue.popleft())
+        if not batch:
+            return
+
+        try:
+            with open(self.path, "ab") as f:
+                f.write(b"".join(_dumps_line(record) for record in batch))
+        except OSError as e:
+            self._queue.extendleft(reversed(batch))
+            logger.error("Failed to write %s audit records to %s, retrying on the next flush: %s",
+                         len(batch), self.path, e)
@@ -1,11 +1,20 @@
 """Data access layer for the MCP server."""
 
-import json
 import logging
-from datetime import datetime
+import time
+from collections import deque
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, Union
 
+try:
+    import ijson
+except ImportError:  # optional streaming parser, installed with the 'fast' extra
+    ijson = None
+
+from pydantic import TypeAdapter
+
+from audit_log import AuditLogWriter
 from models import (
     AuditRecord,
     Department,
@@ -18,139 +27,202 @@ from models import (
 
 logger = logging.getLogger(__name__)
 
+# Validators for the data files; the models read the camelCase keys directly
+_USER_LIST = TypeAdapter(List[User])
+_DEPARTMENT_LIST = TypeAdapter(List[Department])
+_PRODUCT_LIST = TypeAdapter(List[Product])
+_SUPPLIER_LIST = TypeAdapter(List[Supplier])
+_PRODUCT_DETAILS_LIST = TypeAdapter(List[ProductDetails])
+
+# Search terms mapped to the catalog terms of equivalent products, e.g. a search for
+# "computer" also returns laptops
+EQUIVALENT_TERMS: Dict[str, Tuple[str, ...]] = {
+    "computer": ("laptop",),
+    "pc": ("laptop",),
+    "notebook computer": ("laptop",),
+    "seat": ("chair",),
+    "printer paper": ("notebooks",),
+    "paper": ("notebooks",),
+    "flyer": ("brochures",),
+    "leaflet": ("brochures",),
+    "application": ("software",),
+}
+
+# Distinct normalized search terms whose results are memoized
+SEARCH_CACHE_SIZE = 512
+
+# Recent audit records kept in memory; the durable copy goes to the audit log
+MAX_AUDIT_RECORDS_IN_MEMORY = 1000
+
 
 class DataStore:
-    """In-memory data store for business entities."""
+    """In-memory data store for business entities, loaded lazily per entity type."""
     
-    def __init__(self, data_dir: Path):
-        """Initialize the data store by loading JSON files.
+    def __init__(self, data_dir: Union[str, Path], audit_log: Optional[AuditLogWriter] = None):
+        """Initialize the data store.
+        
+        Each entity type is loaded from its JSON file on first access, so a worker
+        only parses the files its tool calls need.
         
         Args:
-            data_dir: Path to directory containing JSON data files
+            data_dir: Path to directory containing JSON data files, as a string or Path
+            audit_log: Writer that persists created audit records; without one they
+                are only kept in memory
         """
-        self.data_dir = data_dir
-        self.users: Dict[str, User] = {}
-        self.departments: Dict[str, Department] = {}
-        self.products: Dict[str, Product] = {}
-        self.suppliers: Dict[str, Supplier] = {}
-        self.product_details: Dict[str, List[ProductDetails]] = {}
-        self.audit_records: List[AuditRecord] = []
-        
-        self._load_all_data()
-    
-    def _load_all_data(self) -> None:
-        """Load all data from JSON files."""
-        try:
-            self._load_users()
-            self._load_departments()
-            self._load_products()
-            self._load_suppliers()
-            self._load_product_details()
-            logger.info("Successfully loaded all business data")
-        except Exception as e:
-            logger.error(f"Failed to load data: {e}")
-            raise
-    
-    def _load_users(self) -> None:
-        """Load users from JSON file."""
-        file_path = self.data_dir / "users.json"
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        for user_data in data:
-            # Convert camelCase to snake_case for Pydantic
-            user = User(
-                user_id=user_data["userId"],
-                name=user_data["name"], 
-                department_id=user_data["departmentId"]
-            )
-            self.users[user.user_id] = user
-    
-    def _load_departments(self) -> None:
-        """Load departments from JSON file."""
-        file_path = self.data_dir / "departments.json"
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        for dept_data in data:
-            # Convert camelCase to snake_case for Pydantic
-            department = Department(
-                department_id=dept_data["departmentId"],
-                name=dept_data["name"],
-                allowed_categories=dept_data["allowedCategories"],
-                purchase_strategy=dept_data["purchaseStrategy"],
-                monthly_budget=dept_data["monthlyBudget"],
-                requires_audit=dept_data.get("requiresAudit", False)
-            )
-            self.departments[department.department_id] = department
-    
-    def _load_products(self) -> None:
-        """Load products from JSON file."""
-        file_path = self.data_dir / "products.json"
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        for product_data in data:
-            # Convert camelCase to snake_case for Pydantic
-            product = Product(
-                product_id=product_data["productId"],
-                name=product_data["name"],
-                description=product_data["description"],
-                category=product_data["category"]
-            )
-            self.products[product.product_id] = product
-    
-    def _load_suppliers(self) -> None:
-        """Load suppliers from JSON file."""
-        file_path = self.data_dir / "suppliers.json"
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        for supplier_data in data:
-            # Convert camelCase to snake_case for Pydantic
-            supplier = Supplier(
-                supplier_id=supplier_data["supplierId"],
-                name=supplier_data["name"],
-                reliability_score=supplier_data.get("reliabilityScore", 7.0),
-                contact_info=supplier_data.get("contactInfo", "")
-            )
-            self.suppliers[supplier.supplier_id] = supplier
-    
-    def _load_product_details(self) -> None:
-        """Load product details from JSON file."""
-        file_path = self.data_dir / "product_details.json"
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        for detail_data in data:
-            # Convert camelCase to snake_case for Pydantic
-            detail = ProductDetails(
-                product_id=detail_data["productId"],
-                supplier_id=detail_data["supplierId"],
-                price=detail_data["price"],
-                availability=detail_data["availability"],
-                delivery_days=detail_data["deliveryDays"],
-                minimum_order=detail_data.get("minimumOrder", 1)
-            )
-            product_id = detail.product_id
-            
-            if product_id not in self.product_details:
-                self.product_details[product_id] = []
-            
-            self.product_details[product_id].append(detail)
+        self.data_dir = Path(data_dir)
+        self.audit_log = audit_log
+        self.audit_records: Deque[AuditRecord] = deque(maxlen=MAX_AUDIT_RECORDS_IN_MEMORY)
+        # The catalog is static after loading (products is a cached_property that is never
+        # invalidated), so search results only depend on the term. Anything that reloads
+        # the catalog must also call self._search_cached.cache_clear().
+        self._search_cached = lru_cache(maxsize=SEARCH_CACHE_SIZE)(self._search_uncached)
+        # Budgets are computed on first request; the mock spend never changes
+        self._budget_cache: Dict[str, Tuple[DepartmentBudget, Dict[str, Any]]] = {}
+    
+    def _decode(self, file_name: str, adapter: TypeAdapter) -> Any:
+        """Validate a JSON data file straight from its bytes, without an intermediate dict."""
+        return adapter.validate_json((self.data_dir / file_name).read_bytes())
+    
+    @cached_property
+    def users(self) -> Dict[str, User]:
+        """Users by ID, loaded from JSON on first access."""
+        users = {user.user_id: user for user in self._decode("users.json", _USER_LIST)}
+        logger.info("Loaded %s users", len(users))
+        return users
+    
+    @cached_property
+    def departments(self) -> Dict[str, Department]:
+        """Departments by ID, loaded from JSON on first access."""
+        departments = {
+            department.department_id: department
+            for department in self._decode("departments.json", _DEPARTMENT_LIST)
+        }
+        logger.info("Loaded %s departments", len(departments))
+        return departments
+    
+    @cached_property
+    def products(self) -> Dict[str, Product]:
+        """Products by ID, loaded from JSON on first access."""
+        products = {product.product_id: product for product in self._decode("products.json", _PRODUCT_LIST)}
+        logger.info("Loaded %s products", len(products))
+        return products
+    
+    @cached_property
+    def suppliers(self) -> Dict[str, Supplier]:
+        """Suppliers by ID, loaded from JSON on first access."""
+        suppliers = {
+            supplier.supplier_id: supplier
+            for supplier in self._decode("suppliers.json", _SUPPLIER_LIST)
+        }
+        logger.info("Loaded %s suppliers", len(suppliers))
+        return suppliers
+    
+    def _iter_product_details(self) -> Iterator[ProductDetails]:
+        """Yield the product offers, streaming them one object at a time when ijson is installed.
+        
+        Streaming keeps peak memory at one parsed object instead of the whole file,
+        which matters for large catalogs on memory-limited containers.
+        """
+        if ijson is None:
+            yield from self._decode("product_details.json", _PRODUCT_DETAILS_LIST)
+            return
+        
+        with open(self.data_dir / "product_details.json", "rb") as f:
+            for item in ijson.items(f, "item", use_float=True):
+                yield ProductDetails.model_validate(item)
+    
+    @cached_property
+    def product_details(self) -> Dict[str, Dict[str, ProductDetails]]:
+        """Product ID -> supplier ID -> offer, so filtering by supplier is a lookup."""
+        product_details: Dict[str, Dict[str, ProductDetails]] = {}
+        for detail in self._iter_product_details():
+            product_details.setdefault(detail.product_id, {})[detail.supplier_id] = detail
+        logger.info("Loaded product details for %s products", len(product_details))
+        return product_details
+    
+    # Serialized snapshots of the static entities, built once so the MCP tools do not
+    # re-run model_dump() on every call
+    @cached_property
+    def _user_dicts(self) -> Dict[str, Dict[str, Any]]:
+        return {user_id: user.model_dump() for user_id, user in self.users.items()}
+    
+    @cached_property
+    def _department_dicts(self) -> Dict[str, Dict[str, Any]]:
+        return {dept_id: dept.model_dump() for dept_id, dept in self.departments.items()}
+    
+    @cached_property
+    def _product_dicts(self) -> Dict[str, Dict[str, Any]]:
+        return {product_id: product.model_dump() for product_id, product in self.products.items()}
+    
+    @cached_property
+    def _supplier_dicts(self) -> Dict[str, Dict[str, Any]]:
+        return {supplier_id: supplier.model_dump() for supplier_id, supplier in self.suppliers.items()}
+    
+    @cached_property
+    def _product_detail_dicts(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return {
+            product_id: {supplier_id: detail.model_dump() for supplier_id, detail in details.items()}
+            for product_id, details in self.product_details.items()
+        }
+    
+    @cached_property
+    def _search_rows(self) -> List[Tuple[str, str, Product]]:
+        """Lowercased name and description per product, built once for search_products."""
+        return [
+            (product.name.lower(), product.description.lower(), product)
+            for product in self.products.values()
+        ]
+    
+    @cached_property
+    def _synonym_index(self) -> Dict[str, List[Product]]:
+        """Equivalent search term -> products matching its catalog terms.
+        
+        A synonym query is one lookup instead of another scan per catalog term.
+        """
+        index: Dict[str, List[Product]] = {}
+        for term, equivalents in EQUIVALENT_TERMS.items():
+            matches: Dict[str, Product] = {}
+            for equivalent in equivalents:
+                for product in self._match_products(equivalent):
+                    matches.setdefault(product.product_id, product)
+            if matches:
+                index[term] = list(matches.values())
+        return index
     
     # User operations
     def get_user(self, user_id: str) -> Optional[User]:
         """Get user by ID."""
         return self.users.get(user_id)
     
+    def get_user_dict(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get the serialized user by ID; the shared snapshot must not be modified."""
+        return self._user_dicts.get(user_id)
+    
     # Department operations
     def get_department(self, department_id: str) -> Optional[Department]:
         """Get department by ID."""
         return self.departments.get(department_id)
     
+    def get_department_dict(self, department_id: str) -> Optional[Dict[str, Any]]:
+        """Get the serialized department by ID; the shared snapshot must not be modified."""
+        return self._department_dicts.get(department_id)
+    
     def get_department_budget(self, department_id: str) -> Optional[DepartmentBudget]:
         """Get current budget information for a department."""
+        cached = self._get_cached_budget(department_id)
+        return cached[0] if cached else None
+    
+    def get_department_budget_dict(self, department_id: str) -> Optional[Dict[str, Any]]:
+        """Get the serialized budget of a department; the shared snapshot must not be modified."""
+        cached = self._get_cached_budget(department_id)
+        return cached[1] if cached else None
+    
+    def _get_cached_budget(self, department_id: str) -> Optional[Tuple[DepartmentBudget, Dict[str, Any]]]:
+        """Compute a department's budget once and reuse it for later requests."""
+        cached = self._budget_cache.get(department_id)
+        if cached:
+            return cached
+        
         department = self.get_department(department_id)
         if not department:
             return None
@@ -159,26 +231,46 @@ class DataStore:
         spent_this_month = 2500.0  # Mock spent amount
         remaining = department.monthly_budget - spent_this_month
         
-        return DepartmentBudget(
+        budget = DepartmentBudget(
             department_id=department_id,
             monthly_budget=department.monthly_budget,
             spent_this_month=spent_this_month,
             remaining_budget=remaining,
-            last_updated=datetime.now()
+            last_updated_ms=time.time_ns() // 1_000_000
         )
+        cached = self._budget_cache[department_id] = (budget, budget.model_dump())
+        return cached
     
     # Product operations
     def search_products(self, name: str) -> List[Product]:
-        """Search products by name (case-insensitive partial match)."""
-        search_term = name.lower()
-        results = []
+        """Search products by name (case-insensitive partial match).
         
-        for product in self.products.values():
-            if (search_term in product.name.lower() or 
-                search_term in product.description.lower()):
-                results.append(product)
+        Products matching an equivalent term from ``EQUIVALENT_TERMS`` follow the
+        direct matches, without duplicates.
+        """
+        return list(self._search_cached(" ".join(name.lower().split())))
+    
+    def _search_uncached(self, search_term: str) -> Tuple[Product, ...]:
+        """Search for a normalized term; memoized per instance by ``search_products``."""
+        results = self._match_products(search_term)
+        
+        equivalents = self._synonym_index.get(search_term)
+        if equivalents:
+            found = {product.product_id for product in results}
+            results.extend(p for p in equivalents if p.product_id not in found)
         
-        return results
+        return tuple(results)
+    
+    def _match_products(self, search_term: str) -> List[Product]:
+        """Products whose lowercased name or description contains the term."""
+        return [
+            product for name_lower, description_lower, product in self._search_rows
+            if search_term in name_lower or search_term in description_lower
+        ]
+    
+    def search_product_dicts(self, name: str) -> List[Dict[str, Any]]:
+        """Search products like ``search_products`` and return their serialized snapshots."""
+        return [self._product_dicts[product.product_id] for product in self.search_products(name)]
     
     def get_product(self, product_id: str) -> Optional[Product]:
         """Get product by ID."""
@@ -189,26 +281,41 @@ class DataStore:
         """Get supplier by ID."""
         return self.suppliers.get(supplier_id)
     
+    def get_supplier_dict(self, supplier_id: str) -> Optional[Dict[str, Any]]:
+        """Get the serialized supplier by ID; the shared snapshot must not be modified."""
+        return self._supplier_dicts.get(supplier_id)
+    
     # Product details operations
     def get_product_details(self, product_id: str, supplier_id: Optional[str] = None) -> List[ProductDetails]:
         """Get product details, optionally filtered by supplier."""
-        details = self.product_details.get(product_id, [])
+        details = self.product_details.get(product_id, {})
+        
+        if supplier_id:
+            detail = details.get(supplier_id)
+            return [detail] if detail else []
+        
+        return list(details.values())
+    
+    def get_product_detail_dicts(self, product_id: str, supplier_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get serialized product details like ``get_product_details``."""
+        details = self._product_detail_dicts.get(product_id, {})
         
         if supplier_id:
-            details = [d for d in details if d.supplier_id == supplier_id]
+            detail = details.get(supplier_id)
+            return [detail] if detail else []
         
-        return details
+        return list(details.values())
     
     def get_all_suppliers_for_product(self, product_id: str) -> List[ProductDetails]:
         """Get all supplier options for a product."""
-        return self.product_details.get(product_id, [])
+        return list(self.product_details.get(product_id, {}).values())
     
     # Audit operations
     def create_audit_record(self, user_id: str, action: str, details: Dict, 
                           decision_reasoning: Optional[str] = None) -> AuditRecord:
         """Create a new audit record."""
         record = AuditRecord(
-            timestamp=datetime.now(),
+            timestamp_ms=time.time_ns() // 1_000_000,
             user_id=user_id,
             action=action,
             details=details,
@@ -216,6 +323,8 @@ class DataStore:
         )
         
         self.audit_records.append(record)
-        logger.info(f"Created audit record for user {user_id}: {action}")
+        if self.audit_log is not None:
+            self.audit_log.append(record)
+        logger.info("Created audit record for user %s: %s", user_id, action)
         
         return record
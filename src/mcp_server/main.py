@@ -1,13 +1,26 @@
 """MCP server for purchase order processing business logic."""
 
+import asyncio
+import atexit
 import logging
+import os
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from fastmcp import FastMCP
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+from fastmcp.tools import Tool
+from fastmcp.tools.tool import ToolResult
+from mcp.types import Tool as MCPTool
 
+from audit_log import DEFAULT_BATCH_SIZE, AuditLogWriter
 from data_store import DataStore
 
+try:
+    import orjson
+except ImportError:  # optional speedup, installed with the 'fast' extra
+    orjson = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -15,20 +28,99 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Get transport mode from environment variable
+# Azure AI Foundry uses SSE, modern clients use streamable-http
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "streamable-http")
+
+# Persist audit records in batches when a log file is configured
+AUDIT_LOG_PATH = os.getenv("AUDIT_LOG_PATH")
+audit_log = None
+if AUDIT_LOG_PATH:
+    audit_log = AuditLogWriter(
+        AUDIT_LOG_PATH,
+        batch_size=int(os.getenv("AUDIT_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+        flush_interval=int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "1000")) / 1000
+    )
+    atexit.register(audit_log.close)
+
+# Maximum number of IDs accepted by one batched lookup tool
+MAX_BATCH_IDS = 50
+# Maximum number of calls accepted by one batch_execute request
+MAX_BATCH_CALLS = 20
+
 # Initialize data store
 DATA_DIR = Path(__file__).parent / "data"
-data_store = DataStore(DATA_DIR)
+data_store = DataStore(DATA_DIR, audit_log=audit_log)
+
+
+def _serialize_tool_result(data: Any) -> str:
+    """Encode a tool result as JSON text with orjson, falling back to str() like FastMCP."""
+    return orjson.dumps(data, default=str).decode()
+
+
+class ToolErrorLogging(Middleware):
+    """Logs every failed tool call once, in place of per-tool exception handlers."""
+    
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        try:
+            return await call_next(context)
+        except Exception as e:
+            logger.error("❌ MCP TOOL ERROR: %s -> %s", context.message.name, e)
+            raise
+
+
+class PurchaseOrderMCP(FastMCP):
+    """FastMCP server that converts each tool's MCP description only once.
+    
+    tools/list still goes through FastMCP's listing on every request, so disabled
+    tools and list middleware are honored. Only the conversion of each tool to its
+    MCP description (name, docstring and JSON schema) is reused until the tool is
+    replaced or removed.
+    """
+    
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # Tool key -> (tool, its MCP description)
+        self._mcp_tools: Dict[str, Tuple[Tool, MCPTool]] = {}
+    
+    async def _mcp_list_tools(self) -> List[MCPTool]:
+        return [self._to_mcp_tool(tool) for tool in await self._list_tools()]
+    
+    def _to_mcp_tool(self, tool: Tool) -> MCPTool:
+        cached = self._mcp_tools.get(tool.key)
+        if cached is None or cached[0] is not tool:
+            cached = (tool, tool.to_mcp_tool(name=tool.key))
+            self._mcp_tools[tool.key] = cached
+        return cached[1]
+    
+    def remove_tool(self, name: str) -> None:
+        self._mcp_tools.pop(name, None)
+        super().remove_tool(name)
+
 
 # Create the MCP server
-mcp = FastMCP(
+mcp = PurchaseOrderMCP(
     name="Purchase Order Processing Server",
     instructions="""
     This server provides business data and tools for internal purchase order processing.
     Use get_user() to find user information, get_department_policy() for department rules,
     search_products() to find products, and get_product_details() for supplier information.
     Always check department policies before making recommendations.
-    """
+    """,
+    # Without orjson FastMCP's default pydantic_core encoder is used
+    tool_serializer=_serialize_tool_result if orjson is not None else None
 )
+mcp.add_middleware(ToolErrorLogging())
+
+
+def _not_found(tool_name: str, entity_id: str, reason: str) -> Dict[str, Any]:
+    """Result returned for an unknown ID instead of raising a tool error.
+    
+    Agents probe IDs routinely, and a plain result is cheaper than an exception that
+    FastMCP has to translate into an error response.
+    """
+    logger.info("✅ MCP TOOL RESPONSE: %s -> %s", tool_name, reason)
+    return {"found": False, "id": entity_id, "reason": reason}
 
 
 @mcp.tool()
@@ -39,26 +131,17 @@ def get_user(user_id: str) -> Dict[str, Any]:
         user_id: The unique identifier for the user
         
     Returns:
-        User information including name and department ID
-        
-    Raises:
-        ValueError: If user is not found
+        User information including name and department ID, or
+        {"found": False, "id": ..., "reason": ...} if the user is not found
     """
-    logger.info(f"🔍 MCP TOOL CALL: get_user(user_id='{user_id}')")
+    logger.info("🔍 MCP TOOL CALL: get_user(user_id='%s')", user_id)
     
-    try:
-        user = data_store.get_user(user_id)
-        if not user:
-            error_msg = f"User with ID {user_id} not found"
-            logger.error(f"❌ MCP TOOL ERROR: get_user -> {error_msg}")
-            raise ValueError(error_msg)
-        
-        result = user.model_dump()
-        logger.info(f"✅ MCP TOOL RESPONSE: get_user -> {result}")
-        return result
-    except Exception as e:
-        logger.error(f"❌ MCP TOOL ERROR: get_user -> {str(e)}")
-        raise
+    result = data_store.get_user_dict(user_id)
+    if result is None:
+        return _not_found("get_user", user_id, f"User with ID {user_id} not found")
+    
+    logger.info("✅ MCP TOOL RESPONSE: get_user -> %s", result)
+    return result
 
 
 @mcp.tool()
@@ -69,26 +152,17 @@ def get_department_policy(department_id: str) -> Dict[str, Any]:
         department_id: The unique identifier for the department
         
     Returns:
-        Department policy including allowed categories, purchase strategy, and audit requirements
-        
-    Raises:
-        ValueError: If department is not found
+        Department policy including allowed categories, purchase strategy, and audit
+        requirements, or {"found": False, "id": ..., "reason": ...} if the department is not found
     """
-    logger.info(f"🔍 MCP TOOL CALL: get_department_policy(department_id='{department_id}')")
+    logger.info("🔍 MCP TOOL CALL: get_department_policy(department_id='%s')", department_id)
     
-    try:
-        department = data_store.get_department(department_id)
-        if not department:
-            error_msg = f"Department with ID {department_id} not found"
-            logger.error(f"❌ MCP TOOL ERROR: get_department_policy -> {error_msg}")
-            raise ValueError(error_msg)
-        
-        result = department.model_dump()
-        logger.info(f"✅ MCP TOOL RESPONSE: get_department_policy -> {result}")
-        return result
-    except Exception as e:
-        logger.error(f"❌ MCP TOOL ERROR: get_department_policy -> {str(e)}")
-        raise
+    result = data_store.get_department_dict(department_id)
+    if result is None:
+        return _not_found("get_department_policy", department_id, f"Department with ID {department_id} not found")
+    
+    logger.info("✅ MCP TOOL RESPONSE: get_department_policy -> %s", result)
+    return result
 
 
 @mcp.tool()
@@ -99,26 +173,51 @@ def get_department_budget(department_id: str) -> Dict[str, Any]:
         department_id: The unique identifier for the department
         
     Returns:
-        Budget information including total, spent, and remaining amounts
-        
-    Raises:
-        ValueError: If department is not found
+        Budget information including total, spent, and remaining amounts, or
+        {"found": False, "id": ..., "reason": ...} if the department is not found
     """
-    logger.info(f"🔍 MCP TOOL CALL: get_department_budget(department_id='{department_id}')")
+    logger.info("🔍 MCP TOOL CALL: get_department_budget(department_id='%s')", department_id)
+    
+    result = data_store.get_department_budget_dict(department_id)
+    if result is None:
+        return _not_found("get_department_budget", department_id, f"Budget information for department {department_id} not found")
+    
+    logger.info("✅ MCP TOOL RESPONSE: get_department_budget -> %s", result)
+    return result
+
+
+@mcp.tool()
+def get_user_context(user_id: str) -> Dict[str, Any]:
+    """Get a user together with their department policy and budget.
     
-    try:
-        budget = data_store.get_department_budget(department_id)
-        if not budget:
-            error_msg = f"Budget information for department {department_id} not found"
-            logger.error(f"❌ MCP TOOL ERROR: get_department_budget -> {error_msg}")
-            raise ValueError(error_msg)
+    Replaces the get_user -> get_department_policy -> get_department_budget chain
+    that starts every purchase request with a single call.
+    
+    Args:
+        user_id: The unique identifier for the user
         
-        result = budget.model_dump()
-        logger.info(f"✅ MCP TOOL RESPONSE: get_department_budget -> {result}")
-        return result
-    except Exception as e:
-        logger.error(f"❌ MCP TOOL ERROR: get_department_budget -> {str(e)}")
-        raise
+    Returns:
+        {"user": ..., "department": ..., "budget": ...} in the formats of the
+        individual tools, or {"found": False, "id": ..., "reason": ...} if the user or their department is not found
+    """
+    logger.info("🔍 MCP TOOL CALL: get_user_context(user_id='%s')", user_id)
+    
+    user = data_store.get_user_dict(user_id)
+    if user is None:
+        return _not_found("get_user_context", user_id, f"User with ID {user_id} not found")
+    
+    department_id = user["department_id"]
+    department = data_store.get_department_dict(department_id)
+    if department is None:
+        return _not_found("get_user_context", department_id, f"Department with ID {department_id} not found")
+    
+    result = {
+        "user": user,
+        "department": department,
+        "budget": data_store.get_department_budget_dict(department_id),
+    }
+    logger.info("✅ MCP TOOL RESPONSE: get_user_context -> user %s in department %s", user_id, department_id)
+    return result
 
 
 @mcp.tool()
@@ -131,16 +230,11 @@ def search_products(name: str) -> List[Dict[str, Any]]:
     Returns:
         List of matching products with their details
     """
-    logger.info(f"🔍 MCP TOOL CALL: search_products(name='{name}')")
+    logger.info("🔍 MCP TOOL CALL: search_products(name='%s')", name)
     
-    try:
-        products = data_store.search_products(name)
-        result = [product.model_dump() for product in products]
-        logger.info(f"✅ MCP TOOL RESPONSE: search_products -> Found {len(result)} products")
-        return result
-    except Exception as e:
-        logger.error(f"❌ MCP TOOL ERROR: search_products -> {str(e)}")
-        raise
+    result = data_store.search_product_dicts(name)
+    logger.info("✅ MCP TOOL RESPONSE: search_products -> Found %s products", len(result))
+    return result
 
 
 @mcp.tool()
@@ -152,26 +246,14 @@ def get_product_details(product_id: str, supplier_id: str = None) -> List[Dict[s
         supplier_id: Optional supplier ID to filter by specific supplier
         
     Returns:
-        List of product details including pricing, availability, and delivery information
-        
-    Raises:
-        ValueError: If product is not found
+        List of product details including pricing, availability, and delivery
+        information; empty if the product has no matching offers
     """
-    logger.info(f"🔍 MCP TOOL CALL: get_product_details(product_id='{product_id}', supplier_id='{supplier_id}')")
+    logger.info("🔍 MCP TOOL CALL: get_product_details(product_id='%s', supplier_id='%s')", product_id, supplier_id)
     
-    try:
-        details = data_store.get_product_details(product_id, supplier_id)
-        if not details:
-            error_msg = f"No product details found for product {product_id}"
-            logger.error(f"❌ MCP TOOL ERROR: get_product_details -> {error_msg}")
-            raise ValueError(error_msg)
-        
-        result = [detail.model_dump() for detail in details]
-        logger.info(f"✅ MCP TOOL RESPONSE: get_product_details -> Found {len(result)} supplier options")
-        return result
-    except Exception as e:
-        logger.error(f"❌ MCP TOOL ERROR: get_product_details -> {str(e)}")
-        raise
+    result = data_store.get_product_detail_dicts(product_id, supplier_id)
+    logger.info("✅ MCP TOOL RESPONSE: get_product_details -> Found %s supplier options", len(result))
+    return result
 
 
 @mcp.tool()
@@ -182,26 +264,17 @@ def get_supplier_info(supplier_id: str) -> Dict[str, Any]:
         supplier_id: The unique identifier for the supplier
         
     Returns:
-        Supplier information including name, reliability score, and contact info
-        
-    Raises:
-        ValueError: If supplier is not found
+        Supplier information including name, reliability score, and contact info, or
+        {"found": False, "id": ..., "reason": ...} if the supplier is not found
     """
-    logger.info(f"🔍 MCP TOOL CALL: get_supplier_info(supplier_id='{supplier_id}')")
+    logger.info("🔍 MCP TOOL CALL: get_supplier_info(supplier_id='%s')", supplier_id)
     
-    try:
-        supplier = data_store.get_supplier(supplier_id)
-        if not supplier:
-            error_msg = f"Supplier with ID {supplier_id} not found"
-            logger.error(f"❌ MCP TOOL ERROR: get_supplier_info -> {error_msg}")
-            raise ValueError(error_msg)
-        
-        result = supplier.model_dump()
-        logger.info(f"✅ MCP TOOL RESPONSE: get_supplier_info -> {result}")
-        return result
-    except Exception as e:
-        logger.error(f"❌ MCP TOOL ERROR: get_supplier_info -> {str(e)}")
-        raise
+    result = data_store.get_supplier_dict(supplier_id)
+    if result is None:
+        return _not_found("get_supplier_info", supplier_id, f"Supplier with ID {supplier_id} not found")
+    
+    logger.info("✅ MCP TOOL RESPONSE: get_supplier_info -> %s", result)
+    return result
 
 
 @mcp.tool()
@@ -218,31 +291,199 @@ def create_audit_record(user_id: str, action: str, details: Dict[str, Any],
     Returns:
         The created audit record
     """
-    logger.info(f"🔍 MCP TOOL CALL: create_audit_record(user_id='{user_id}', action='{action}')")
+    logger.info("🔍 MCP TOOL CALL: create_audit_record(user_id='%s', action='%s')", user_id, action)
     
-    try:
-        record = data_store.create_audit_record(user_id, action, details, decision_reasoning)
-        result = record.model_dump()
-        logger.info(f"✅ MCP TOOL RESPONSE: create_audit_record -> Created audit record with ID {result.get('id', 'unknown')}")
-        return result
-    except Exception as e:
-        logger.error(f"❌ MCP TOOL ERROR: create_audit_record -> {str(e)}")
-        raise
+    record = data_store.create_audit_record(user_id, action, details, decision_reasoning)
+    result = record.model_dump()
+    logger.info("✅ MCP TOOL RESPONSE: create_audit_record -> Created audit record with ID %s", result.get('id', 'unknown'))
+    return result
 
 
-if __name__ == "__main__":
-    import os
+def _lookup_many(ids: List[str], lookup: Callable[[str], Any],
+                 fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Resolve several IDs with one lookup function for the batched getters.
+    
+    Duplicate IDs are resolved once. Entities are projected onto ``fields`` when
+    given, so callers can keep responses small.
+    
+    Returns:
+        The found entities in request order, the IDs that were not found, and the
+        number of entities returned
+    """
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f"At most {MAX_BATCH_IDS} IDs can be requested at once, got {len(ids)}")
+    
+    results, missing = [], []
+    for entity_id in dict.fromkeys(ids):
+        entity = lookup(entity_id)
+        if entity is None:
+            missing.append(entity_id)
+        elif fields:
+            results.append({field: entity[field] for field in fields if field in entity})
+        else:
+            results.append(entity)
+    return {"results": results, "missing": missing, "count": len(results)}
+
+
+@mcp.tool()
+def get_users(user_ids: List[str], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get several users in one call.
+    
+    Args:
+        user_ids: User IDs to look up, at most 50
+        fields: Optional user fields to return, e.g. ["department_id"]
+        
+    Returns:
+        "results" with the users found, "missing" with the IDs not found, and "count"
+    """
+    logger.info("🔍 MCP TOOL CALL: get_users(%s ids)", len(user_ids))
+    result = _lookup_many(user_ids, data_store.get_user_dict, fields)
+    logger.info("✅ MCP TOOL RESPONSE: get_users -> Found %s, missing %s", result["count"], len(result["missing"]))
+    return result
+
+
+@mcp.tool()
+def get_departments(department_ids: List[str], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get the policies of several departments in one call.
+    
+    Args:
+        department_ids: Department IDs to look up, at most 50
+        fields: Optional department fields to return, e.g. ["allowed_categories"]
+        
+    Returns:
+        "results" with the departments found, "missing" with the IDs not found, and "count"
+    """
+    logger.info("🔍 MCP TOOL CALL: get_departments(%s ids)", len(department_ids))
+    result = _lookup_many(department_ids, data_store.get_department_dict, fields)
+    logger.info("✅ MCP TOOL RESPONSE: get_departments -> Found %s, missing %s", result["count"], len(result["missing"]))
+    return result
+
+
+@mcp.tool()
+def get_suppliers(supplier_ids: List[str], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get several suppliers in one call.
+    
+    Args:
+        supplier_ids: Supplier IDs to look up, at most 50
+        fields: Optional supplier fields to return, e.g. ["reliability_score"]
+        
+    Returns:
+        "results" with the suppliers found, "missing" with the IDs not found, and "count"
+    """
+    logger.info("🔍 MCP TOOL CALL: get_suppliers(%s ids)", len(supplier_ids))
+    result = _lookup_many(supplier_ids, data_store.get_supplier_dict, fields)
+    logger.info("✅ MCP TOOL RESPONSE: get_suppliers -> Found %s, missing %s", result["count"], len(result["missing"]))
+    return result
+
+
+@mcp.tool()
+def get_product_details_many(product_ids: List[str], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Get the supplier offers of several products in one call.
+    
+    Args:
+        product_ids: Product IDs to look up, at most 50
+        fields: Optional offer fields to return, e.g. ["supplier_id", "price"]
+        
+    Returns:
+        "results" with one {"product_id", "offers"} entry per product found,
+        "missing" with the product IDs without offers, and "count"
+    """
+    logger.info("🔍 MCP TOOL CALL: get_product_details_many(%s ids)", len(product_ids))
+    
+    def lookup(product_id: str) -> Optional[Dict[str, Any]]:
+        offers = data_store.get_product_detail_dicts(product_id)
+        if not offers:
+            return None
+        if fields:
+            offers = [{field: offer[field] for field in fields if field in offer} for offer in offers]
+        return {"product_id": product_id, "offers": offers}
+    
+    result = _lookup_many(product_ids, lookup)
+    logger.info("✅ MCP TOOL RESPONSE: get_product_details_many -> Found %s, missing %s", result["count"], len(result["missing"]))
+    return result
+
+
+# Tools that can be dispatched through batch_execute
+BATCHABLE_TOOLS = frozenset({
+    "get_user",
+    "get_department_policy",
+    "get_department_budget",
+    "get_user_context",
+    "search_products",
+    "get_product_details",
+    "get_supplier_info",
+    "create_audit_record",
+})
+
+
+def _structured_output(tool: Tool, result: ToolResult) -> Any:
+    """Return the structured output of a tool run, unwrapping non-object results."""
+    if tool.output_schema and tool.output_schema.get("x-fastmcp-wrap-result"):
+        return result.structured_content["result"]
+    return result.structured_content
+
+
+@mcp.tool()
+async def batch_execute(calls: List[Dict[str, Any]], max_concurrent: int = 4) -> List[Dict[str, Any]]:
+    """Execute several independent tool calls in a single round-trip.
+    
+    Args:
+        calls: List of calls, each as {"tool": "<tool name>", "arguments": {...}}
+        max_concurrent: Maximum number of calls executed at the same time
+        
+    Returns:
+        One entry per call in request order, containing the tool name and either
+        a "result" or an "error" message
+    """
+    if len(calls) > MAX_BATCH_CALLS:
+        raise ValueError(f"At most {MAX_BATCH_CALLS} calls can be batched at once, got {len(calls)}")
+    
+    logger.info("🔍 MCP TOOL CALL: batch_execute(%s calls, max_concurrent=%s)", len(calls), max_concurrent)
+    
+    semaphore = asyncio.Semaphore(max(1, max_concurrent))
+    
+    tools = await mcp.get_tools()
+    
+    async def execute(call: Dict[str, Any]) -> Dict[str, Any]:
+        tool_name = call.get("tool")
+        # Disabled tools are treated as unknown, as they are for direct tools/call requests
+        tool = tools.get(tool_name) if tool_name in BATCHABLE_TOOLS else None
+        if tool is None or not mcp._should_enable_component(tool):
+            return {"tool": tool_name, "error": f"Unknown tool: {tool_name}"}
+        
+        async with semaphore:
+            try:
+                # Tool.run validates the arguments against the tool's schema
+                result = await tool.run(call.get("arguments") or {})
+                return {"tool": tool_name, "result": _structured_output(tool, result)}
+            except Exception as e:
+                # Calls inside a batch bypass the middleware, so failures are logged here
+                logger.error("❌ MCP TOOL ERROR: %s -> %s", tool_name, e)
+                return {"tool": tool_name, "error": str(e)}
     
+    results = await asyncio.gather(*(execute(call) for call in calls))
+    
+    # The failure count is only needed for the log line
+    if logger.isEnabledFor(logging.INFO):
+        failed = sum(1 for r in results if "error" in r)
+        logger.info("✅ MCP TOOL RESPONSE: batch_execute -> %s succeeded, %s failed", len(results) - failed, failed)
+    return list(results)
+
+
+# ASGI app for multi-process serving, e.g. `uvicorn main:app --workers 4`.
+# Consecutive requests of one client may reach different workers, so streamable
+# HTTP runs without server-side sessions; SSE streams are tied to one process and
+# need a single worker.
+app = mcp.http_app(transport=MCP_TRANSPORT, stateless_http=MCP_TRANSPORT != "sse")
+
+
+if __name__ == "__main__":
     logger.info("Starting Purchase Order MCP Server...")
     
     # Get port from environment variable or default to 8000
     port = int(os.getenv("PORT", "8000"))
     
-    # Get transport mode from environment variable
-    # Azure AI Foundry uses SSE, modern clients use streamable-http
-    transport = os.getenv("MCP_TRANSPORT", "streamable-http")
-    
-    logger.info(f"Starting HTTP server on port {port} with transport: {transport}")
+    logger.info("Starting HTTP server on port %s with transport: %s", port, MCP_TRANSPORT)
     
     # Run with specified transport mode
-    mcp.run(transport=transport, host="0.0.0.0", port=port)
+    mcp.run(transport=MCP_TRANSPORT, host="0.0.0.0", port=port)
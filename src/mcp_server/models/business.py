@@ -2,9 +2,19 @@
 
 from datetime import datetime
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import AliasGenerator, BaseModel, ConfigDict, Field, field_serializer
+from pydantic.alias_generators import to_camel
+
+
+# Entities read from the data files validate their camelCase JSON keys directly and
+# can still be constructed with snake_case field names
+DATA_FILE_CONFIG = ConfigDict(
+    frozen=True,
+    alias_generator=AliasGenerator(validation_alias=to_camel),
+    populate_by_name=True,
+)
 
 
 class PurchaseStrategy(str, Enum):
@@ -18,6 +28,8 @@ class PurchaseStrategy(str, Enum):
 class User(BaseModel):
     """User entity representing an employee."""
     
+    model_config = DATA_FILE_CONFIG
+    
     user_id: str = Field(..., description="Unique user identifier")
     name: str = Field(..., description="User's full name")
     department_id: str = Field(..., description="ID of user's department")
@@ -26,27 +38,43 @@ class User(BaseModel):
 class Department(BaseModel):
     """Department entity with purchasing policies."""
     
+    model_config = DATA_FILE_CONFIG
+    
     department_id: str = Field(..., description="Unique department identifier")
     name: str = Field(..., description="Department name")
-    allowed_categories: List[str] = Field(..., description="Categories this department can purchase")
+    allowed_categories: FrozenSet[str] = Field(..., description="Categories this department can purchase")
     purchase_strategy: PurchaseStrategy = Field(..., description="Strategy for supplier selection")
     monthly_budget: float = Field(..., description="Monthly budget limit")
     requires_audit: bool = Field(default=False, description="Whether purchases require audit logging")
+    
+    @field_serializer("allowed_categories")
+    def _serialize_allowed_categories(self, categories: FrozenSet[str]) -> List[str]:
+        # Sets have no JSON form, so tool responses get a sorted list
+        return sorted(categories)
 
 
 class DepartmentBudget(BaseModel):
     """Current budget information for a department."""
     
+    model_config = ConfigDict(frozen=True)
+    
     department_id: str = Field(..., description="Department identifier")
     monthly_budget: float = Field(..., description="Total monthly budget")
     spent_this_month: float = Field(..., description="Amount spent this month")
     remaining_budget: float = Field(..., description="Remaining budget for the month")
-    last_updated: datetime = Field(..., description="When budget was last updated")
+    last_updated_ms: int = Field(..., description="When budget was last updated, in epoch milliseconds")
+    
+    @property
+    def last_updated(self) -> datetime:
+        """Local time the budget was last updated."""
+        return datetime.fromtimestamp(self.last_updated_ms / 1000)
 
 
 class Product(BaseModel):
     """Product entity in the catalog."""
     
+    model_config = DATA_FILE_CONFIG
+    
     product_id: str = Field(..., description="Unique product identifier")
     name: str = Field(..., description="Product name")
     description: str = Field(..., description="Detailed product description")
@@ -56,15 +84,19 @@ class Product(BaseModel):
 class Supplier(BaseModel):
     """Supplier entity providing products."""
     
+    model_config = DATA_FILE_CONFIG
+    
     supplier_id: str = Field(..., description="Unique supplier identifier")
     name: str = Field(..., description="Supplier company name")
-    reliability_score: float = Field(..., description="Supplier reliability (0-10)")
-    contact_info: str = Field(..., description="Supplier contact information")
+    reliability_score: float = Field(default=7.0, description="Supplier reliability (0-10)")
+    contact_info: str = Field(default="", description="Supplier contact information")
 
 
 class ProductDetails(BaseModel):
     """Product details from a specific supplier."""
     
+    model_config = DATA_FILE_CONFIG
+    
     product_id: str = Field(..., description="Product identifier")
     supplier_id: str = Field(..., description="Supplier identifier")
     price: float = Field(..., description="Price from this supplier")
@@ -76,11 +108,16 @@ class ProductDetails(BaseModel):
 class AuditRecord(BaseModel):
     """Audit record for purchase decisions."""
     
-    timestamp: datetime = Field(..., description="When the audit record was created")
+    timestamp_ms: int = Field(..., description="When the audit record was created, in epoch milliseconds")
     user_id: str = Field(..., description="User who made the request")
     action: str = Field(..., description="Action taken")
     details: Dict = Field(..., description="Additional details about the action")
     decision_reasoning: Optional[str] = Field(None, description="AI reasoning for the decision")
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Local time the audit record was created."""
+        return datetime.fromtimestamp(self.timestamp_ms / 1000)
 
 
 class PurchaseRecommendation(BaseModel):
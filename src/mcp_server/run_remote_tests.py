@@ -4,20 +4,46 @@ Script to run remote MCP server tests against deployed Azure Container Apps inst
 Uses official MCP Python SDK client with SSE transport.
 
 Usage:
-    python run_remote_tests.py <server-url>
+    python run_remote_tests.py <server-url> [<server-url> ...]
 
 Example:
     python run_remote_tests.py https://mcp.ashystone-fba1adc5.swedencentral.azurecontainerapps.io
+
+Several servers are tested concurrently; each server's output is printed as one
+block once all of them have finished.
 """
 
 import asyncio
+import io
 import sys
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
 from urllib.parse import urlparse
 from contextlib import asynccontextmanager
 from mcp.client.session import ClientSession
 from mcp.client.sse import sse_client
 
 
+# Output buffer of the server test running in the current task, if any
+_OUTPUT_BUFFER: ContextVar[Optional[io.StringIO]] = ContextVar("output_buffer", default=None)
+
+# Endpoint paths served by FastMCP; trailing slashes are stripped before matching
+MCP_ENDPOINT_PATHS = ('/sse', '/mcp')
+
+
+class _TaskOutput(io.TextIOBase):
+    """stdout replacement that sends each task's prints to that task's buffer."""
+    
+    def __init__(self, stream):
+        self._stream = stream
+    
+    def write(self, text: str) -> int:
+        return (_OUTPUT_BUFFER.get() or self._stream).write(text)
+    
+    def flush(self) -> None:
+        self._stream.flush()
+
+
 def validate_url(url: str) -> bool:
     """Validate that the URL is properly formatted."""
     try:
@@ -39,22 +65,16 @@ def normalize_mcp_url(url: str) -> str:
     url = url.rstrip('/')
     
     # If URL already has an MCP endpoint path, use it as-is with trailing slash
-    if url.endswith('/sse') or url.endswith('/mcp'):
+    if url.endswith(MCP_ENDPOINT_PATHS):
         return url + '/'
     
-    # If URL already has the endpoint with trailing slash, return as-is
-    if url.endswith('/sse/') or url.endswith('/mcp/'):
-        return url
-    
     # If URL doesn't have an endpoint path, assume SSE for Azure Container Apps
     # Check if the URL ends with the domain (no path)
-    from urllib.parse import urlparse
-    parsed = urlparse(url)
-    if not parsed.path or parsed.path == '/':
+    if not urlparse(url).path:
         return url + '/sse/'
     
-    # If there's some other path, add trailing slash if needed
-    return url + '/' if not url.endswith('/') else url
+    # If there's some other path, add a trailing slash
+    return url + '/'
 
 
 @asynccontextmanager
@@ -89,19 +109,15 @@ async def test_business_workflow(session: ClientSession):
     budget_result = await session.call_tool("get_department_budget", {"department_id": "IT"})
     print(f"   ✅ Budget: {budget_result.content[0].text}")
     
-    # Step 4: Search for products
-    print("   4. Searching for products...")
-    search_result = await session.call_tool("search_products", {"name": "laptop"})
+    # Steps 4-6 do not depend on each other, so they are sent concurrently
+    print("   4-6. Searching for products, getting product details and supplier information...")
+    search_result, details_result, supplier_result = await asyncio.gather(
+        session.call_tool("search_products", {"name": "laptop"}),
+        session.call_tool("get_product_details", {"product_id": "LAPTOP-001"}),
+        session.call_tool("get_supplier_info", {"supplier_id": "TECHCORP-001"}),
+    )
     print(f"   ✅ Found products: {search_result.content[0].text[:100]}...")
-    
-    # Step 5: Get product details
-    print("   5. Getting product details...")
-    details_result = await session.call_tool("get_product_details", {"product_id": "LAPTOP-001"})
     print(f"   ✅ Product details: {details_result.content[0].text[:100]}...")
-    
-    # Step 6: Get supplier info
-    print("   6. Getting supplier information...")
-    supplier_result = await session.call_tool("get_supplier_info", {"supplier_id": "TECHCORP-001"})
     print(f"   ✅ Supplier: {supplier_result.content[0].text}")
     
     # Step 7: Create audit record
@@ -121,8 +137,12 @@ async def test_business_workflow(session: ClientSession):
     print("\n🎉 Complete business workflow test successful!")
 
 
-async def run_tests(server_url: str):
-    """Run all remote tests against the MCP server."""
+async def run_tests(server_url: str) -> bool:
+    """Run all remote tests against the MCP server.
+    
+    Returns:
+        Whether all tests passed
+    """
     # Normalize the URL to ensure correct endpoint
     mcp_url = normalize_mcp_url(server_url)
     
@@ -131,6 +151,8 @@ async def run_tests(server_url: str):
     print("=" * 60)
     
     try:
+        # One session serves every test below; opening a session per call would repeat
+        # the SSE connection and initialize handshake each time
         async with mcp_session(mcp_url) as session:
             # Test 1: List tools
             print("\n🔄 Test 1: Listing available tools...")
@@ -158,17 +180,50 @@ async def run_tests(server_url: str):
             print("\n" + "=" * 60)
             print("✅ All remote MCP tests passed!")
             print("🎉 Your deployed MCP server is working correctly!")
+            return True
             
     except Exception as e:
         print(f"\n❌ Remote tests failed: {e}")
         print("💡 Check that your server supports MCP SSE transport")
         print("💡 Verify the server URL is correct and accessible")
-        sys.exit(1)
+        return False
+
+
+async def _run_buffered(server_url: str) -> Tuple[bool, str]:
+    """Run the tests for one server, collecting its output instead of printing it."""
+    buffer = io.StringIO()
+    _OUTPUT_BUFFER.set(buffer)
+    return await run_tests(server_url), buffer.getvalue()
+
+
+async def run_all(server_urls: List[str]) -> List[bool]:
+    """Run the tests against every server concurrently.
+    
+    Connecting and initializing dominate a run, so testing several servers takes
+    about as long as the slowest one. Output is collected per server and printed
+    in argument order afterwards.
+    
+    Returns:
+        Whether all tests passed, per server
+    """
+    if len(server_urls) == 1:
+        return [await run_tests(server_urls[0])]
+    
+    stdout = sys.stdout
+    sys.stdout = _TaskOutput(stdout)
+    try:
+        results = await asyncio.gather(*(_run_buffered(url) for url in server_urls))
+    finally:
+        sys.stdout = stdout
+    
+    for _, output in results:
+        print(output)
+    return [passed for passed, _ in results]
 
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python run_remote_tests.py <server-url>")
+    if len(sys.argv) < 2:
+        print("Usage: python run_remote_tests.py <server-url> [<server-url> ...]")
         print("Examples:")
         print("  python run_remote_tests.py https://mcp.ashystone-fba1adc5.swedencentral.azurecontainerapps.io")
         print("  python run_remote_tests.py https://mcp.ashystone-fba1adc5.swedencentral.azurecontainerapps.io/sse")
@@ -178,14 +233,16 @@ def main():
         print("The URL will be automatically normalized to include the correct MCP endpoint.")
         sys.exit(1)
     
-    server_url = sys.argv[1]
+    server_urls = sys.argv[1:]
     
-    if not validate_url(server_url):
-        print(f"Error: Invalid URL format: {server_url}")
-        sys.exit(1)
+    for server_url in server_urls:
+        if not validate_url(server_url):
+            print(f"Error: Invalid URL format: {server_url}")
+            sys.exit(1)
     
     # Run the async tests
-    asyncio.run(run_tests(server_url))
+    if not all(asyncio.run(run_all(server_urls))):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
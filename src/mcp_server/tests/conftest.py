@@ -0,0 +1,47 @@
+"""Shared pytest configuration for the MCP server tests."""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the mcp_server directory to Python path for testing
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-remote",
+        action="store_true",
+        default=False,
+        help="run the remote tests against MCP_SERVER_ENDPOINT (or the default deployment) "
+             "instead of an in-process server"
+    )
+    parser.addoption(
+        "--mcp-timeout",
+        type=float,
+        default=10.0,
+        help="seconds to wait for the MCP server to connect and to answer each request"
+    )
+
+
+def is_remote_run(config) -> bool:
+    """Whether the MCP client tests target a deployed server instead of an in-process one."""
+    return config.getoption("--run-remote") or "MCP_SERVER_ENDPOINT" in os.environ
+
+
+@pytest.fixture(scope="session")
+def run_remote(request):
+    """Whether this run targets a deployed MCP server."""
+    return is_remote_run(request.config)
+
+
+def pytest_collection_modifyitems(config, items):
+    # Tests on the shared MCP session only reach the network in remote runs, so
+    # -m "not remote" keeps their in-process runs
+    if not is_remote_run(config):
+        return
+    for item in items:
+        if "session" in item.fixturenames:
+            item.add_marker(pytest.mark.remote)
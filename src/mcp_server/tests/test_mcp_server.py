@@ -1,5 +1,6 @@
 """Tests for the MCP server functionality."""
 
+import json
 import pytest
 from pathlib import Path
 import sys
@@ -7,6 +8,7 @@ import sys
 # Add the mcp_server directory to Python path for testing
 mcp_server_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(mcp_server_dir))
+DATA_DIR = mcp_server_dir / "data"
 
 from data_store import DataStore
 
@@ -17,8 +19,7 @@ class TestDataStore:
     @pytest.fixture
     def data_store(self):
         """Create a data store instance for testing."""
-        data_dir = Path(__file__).parent.parent / "data"
-        return DataStore(data_dir)
+        return DataStore(DATA_DIR)
     
     def test_get_user(self, data_store):
         """Test user retrieval."""
@@ -66,6 +67,32 @@ class TestDataStore:
             assert len(filtered_details) == 1
             assert filtered_details[0].supplier_id == first_supplier_id
     
+    def test_entity_dicts_match_models(self, data_store):
+        """Test that the precomputed snapshots match the models they were built from."""
+        assert data_store.get_user_dict("alice-001") == data_store.get_user("alice-001").model_dump()
+        assert data_store.get_department_dict("IT") == data_store.get_department("IT").model_dump()
+        assert data_store.get_user_dict("nonexistent") is None
+        
+        details = data_store.get_product_detail_dicts("LAPTOP-001")
+        assert details == [d.model_dump() for d in data_store.get_product_details("LAPTOP-001")]
+        
+        supplier_id = details[0]["supplier_id"]
+        assert data_store.get_supplier_dict(supplier_id) == data_store.get_supplier(supplier_id).model_dump()
+        assert [d["supplier_id"] for d in data_store.get_product_detail_dicts("LAPTOP-001", supplier_id)] == [supplier_id]
+    
+    def test_streamed_product_details_match_validated_file(self, data_store):
+        """Test that the ijson streaming loader yields the same offers as validate_json."""
+        pytest.importorskip("ijson")
+        import data_store as data_store_module
+        
+        streamed = list(data_store._iter_product_details())
+        validated = data_store_module._PRODUCT_DETAILS_LIST.validate_json(
+            (DATA_DIR / "product_details.json").read_bytes()
+        )
+        
+        assert streamed == validated
+        assert all(isinstance(detail.price, float) for detail in streamed)
+    
     def test_department_budget(self, data_store):
         """Test budget calculation."""
         budget = data_store.get_department_budget("IT")
@@ -88,6 +115,204 @@ class TestDataStore:
         assert record.user_id == "alice-001"
         assert record.action == "purchase_approved"
         assert len(data_store.audit_records) == initial_count + 1
+    
+    def test_audit_records_are_written_to_log(self, tmp_path):
+        """Test that audit records are appended to the audit log in batches."""
+        from audit_log import AuditLogWriter
+        
+        log_path = tmp_path / "audit.jsonl"
+        audit_log = AuditLogWriter(log_path, batch_size=2, flush_interval=60)
+        data_store = DataStore(DATA_DIR, audit_log=audit_log)
+        
+        for action in ("purchase_approved", "purchase_denied", "purchase_approved"):
+            data_store.create_audit_record(user_id="alice-001", action=action, details={})
+        audit_log.close()
+        
+        lines = log_path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["action"] for line in lines] == [
+            "purchase_approved", "purchase_denied", "purchase_approved"
+        ]
+    
+    def test_failed_audit_log_write_is_retried(self, tmp_path):
+        """Test that a batch that cannot be written is kept for the next flush."""
+        from audit_log import AuditLogWriter
+        
+        log_path = tmp_path / "missing" / "audit.jsonl"
+        audit_log = AuditLogWriter(log_path, batch_size=10, flush_interval=60)
+        data_store = DataStore(DATA_DIR, audit_log=audit_log)
+        
+        data_store.create_audit_record(user_id="alice-001", action="purchase_approved", details={})
+        audit_log._flush()
+        assert not log_path.exists()
+        
+        data_store.create_audit_record(user_id="alice-001", action="purchase_denied", details={})
+        log_path.parent.mkdir()
+        audit_log.close()
+        
+        lines = log_path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["action"] for line in lines] == ["purchase_approved", "purchase_denied"]
+    
+    def test_audit_records_after_close_are_written(self, tmp_path):
+        """Test that records created after the writer closed are written immediately."""
+        from audit_log import AuditLogWriter
+        
+        log_path = tmp_path / "audit.jsonl"
+        audit_log = AuditLogWriter(log_path, batch_size=10, flush_interval=60)
+        data_store = DataStore(DATA_DIR, audit_log=audit_log)
+        audit_log.close()
+        
+        data_store.create_audit_record(user_id="alice-001", action="purchase_denied", details={})
+        
+        lines = log_path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["action"] for line in lines] == ["purchase_denied"]
+
+
+class TestBatchExecute:
+    """Test the batch_execute aggregator tool."""
+    
+    @pytest.fixture
+    def batch_execute(self):
+        """Return the undecorated batch_execute coroutine function."""
+        import main
+        return main.batch_execute.fn
+    
+    async def test_batch_execute_preserves_order(self, batch_execute):
+        """Test that results are returned in request order."""
+        results = await batch_execute([
+            {"tool": "get_department_policy", "arguments": {"department_id": "IT"}},
+            {"tool": "get_department_budget", "arguments": {"department_id": "IT"}},
+            {"tool": "search_products", "arguments": {"name": "laptop"}},
+        ])
+        
+        assert [r["tool"] for r in results] == [
+            "get_department_policy", "get_department_budget", "search_products"
+        ]
+        assert results[0]["result"]["name"] == "Information Technology"
+        assert results[1]["result"]["monthly_budget"] > 0
+        assert any(p["product_id"] == "LAPTOP-001" for p in results[2]["result"])
+    
+    async def test_batch_execute_isolates_errors(self, batch_execute):
+        """Test that a failing or missing call does not fail the whole batch."""
+        results = await batch_execute([
+            {"tool": "get_user", "arguments": {"user_id": "nonexistent"}},
+            {"tool": "unknown_tool", "arguments": {}},
+            {"tool": "get_user", "arguments": {"user_id": "alice-001"}},
+        ], max_concurrent=1)
+        
+        assert results[0]["result"]["found"] is False
+        assert "Unknown tool" in results[1]["error"]
+        assert results[2]["result"]["name"] == "Alice Johnson"
+    
+    async def test_batch_execute_validates_arguments(self, batch_execute):
+        """Test that batched calls are validated against the tool schemas."""
+        results = await batch_execute([
+            {"tool": "get_user", "arguments": {"user_id": 5}},
+            {"tool": "get_user", "arguments": {"user_id": "alice-001", "bogus": True}},
+            {"tool": "get_user", "arguments": {}},
+        ])
+        
+        assert all("error" in r and "result" not in r for r in results)
+    
+    async def test_batch_execute_skips_disabled_tools(self, batch_execute):
+        """Test that a disabled tool cannot be reached through a batch."""
+        import main
+        
+        tool = await main.mcp.get_tool("get_user")
+        tool.disable()
+        try:
+            results = await batch_execute([{"tool": "get_user", "arguments": {"user_id": "alice-001"}}])
+        finally:
+            tool.enable()
+        
+        assert "Unknown tool" in results[0]["error"]
+    
+    async def test_batch_size_is_limited(self, batch_execute):
+        """Test that oversized batches are rejected."""
+        import main
+        
+        call = {"tool": "get_user", "arguments": {"user_id": "alice-001"}}
+        with pytest.raises(ValueError):
+            await batch_execute([call] * (main.MAX_BATCH_CALLS + 1))
+
+
+class TestCombinedLookupTools:
+    """Test the tools that combine several lookups in one call."""
+    
+    @pytest.fixture
+    def main(self):
+        import main
+        return main
+    
+    def test_get_users_reports_missing(self, main):
+        """Test that found users keep request order and unknown IDs are listed."""
+        result = main.get_users.fn(["carol-003", "nonexistent", "alice-001", "carol-003"])
+        
+        assert [u["user_id"] for u in result["results"]] == ["carol-003", "alice-001"]
+        assert result["missing"] == ["nonexistent"]
+        assert result["count"] == 2
+    
+    def test_fields_limit_returned_data(self, main):
+        """Test that only the requested fields are returned."""
+        result = main.get_departments.fn(["IT"], fields=["allowed_categories"])
+        assert result["results"] == [{"allowed_categories": ["electronics", "software"]}]
+        
+        offers = main.get_product_details_many.fn(["LAPTOP-001", "NOPE"], fields=["price"])
+        assert offers["results"][0]["product_id"] == "LAPTOP-001"
+        assert all(set(offer) == {"price"} for offer in offers["results"][0]["offers"])
+        assert offers["missing"] == ["NOPE"]
+    
+    def test_get_user_context(self, main):
+        """Test that the user, department and budget are returned together."""
+        context = main.get_user_context.fn("bob-002")
+        
+        assert context["user"]["name"] == "Bob Smith"
+        assert context["department"]["department_id"] == "HR"
+        assert context["budget"]["department_id"] == "HR"
+        
+        assert main.get_user_context.fn("nonexistent") == {
+            "found": False, "id": "nonexistent", "reason": "User with ID nonexistent not found"
+        }
+    
+    def test_batch_size_is_limited(self, main):
+        """Test that oversized batches are rejected."""
+        with pytest.raises(ValueError):
+            main.get_suppliers.fn(["TECHCORP-001"] * (main.MAX_BATCH_IDS + 1))
+
+
+async def test_tool_list_is_built_once():
+    """Test that tools/list reuses the converted tool descriptions."""
+    import main
+    
+    tools = await main.mcp._mcp_list_tools()
+    assert {"get_user", "get_user_context", "batch_execute"} <= {tool.name for tool in tools}
+    assert all(a is b for a, b in zip(await main.mcp._mcp_list_tools(), tools))
+
+
+async def test_tools_list_requests_use_the_override():
+    """Test that tools/list requests reach the caching override on the server."""
+    from fastmcp import Client
+    import main
+    
+    main.mcp._mcp_tools.clear()
+    async with Client(main.mcp) as client:
+        tools = await client.list_tools()
+    
+    assert {tool.name for tool in tools} <= set(main.mcp._mcp_tools)
+    assert "get_user" in main.mcp._mcp_tools
+
+
+async def test_tool_list_omits_disabled_tools():
+    """Test that a disabled tool is no longer advertised by the cached tools/list."""
+    import main
+    
+    tool = await main.mcp.get_tool("get_user")
+    assert "get_user" in {t.name for t in await main.mcp._mcp_list_tools()}
+    tool.disable()
+    try:
+        assert "get_user" not in {t.name for t in await main.mcp._mcp_list_tools()}
+    finally:
+        tool.enable()
+    assert "get_user" in {t.name for t in await main.mcp._mcp_list_tools()}
 
 
 if __name__ == "__main__":
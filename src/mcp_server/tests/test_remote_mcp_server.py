@@ -1,10 +1,67 @@
-"""Tests for the remote MCP server deployed to Azure Container Apps using official MCP client."""
+"""Tests for the remote MCP server deployed to Azure Container Apps using official MCP client.
 
+Without --run-remote or MCP_SERVER_ENDPOINT the same tests run against the server
+in-process over a memory transport, so a local run needs no network.
+"""
+
+import asyncio
+import json
+import logging
+import httpx
 import pytest
+import pytest_asyncio
 import os
+import re
+from contextlib import asynccontextmanager, suppress
+from datetime import timedelta
+from urllib.parse import urlparse
 from mcp.client.session import ClientSession
 from mcp.client.sse import sse_client
-from contextlib import asynccontextmanager
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.memory import create_connected_server_and_client_session
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+except ImportError:  # optional, installed with the 'dev' extra
+    h2 = None
+
+# Progress is logged at INFO, shown with --log-cli-level=INFO or on failures
+logger = logging.getLogger(__name__)
+
+# All tests share one event loop so they can share the session opened on it. The
+# remote marker is added by conftest only when the tests target a deployed server.
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Response checks, each a single case-insensitive scan of the tool output
+_NOT_FOUND_RE = re.compile(r"not found|none", re.I)
+_DETAILS_RE = re.compile(r"supplier|price", re.I)
+_ELECTRONICS_RE = re.compile(r"electronics", re.I)
+_BUDGET_RE = re.compile(r"budget.*?\d|\d.*?budget", re.I | re.S)
+_AUDIT_RE = re.compile(r"audit|record", re.I)
+
+# Business tools every server version exposes
+EXPECTED_TOOLS = frozenset({
+    "get_user",
+    "get_department_policy",
+    "get_department_budget",
+    "search_products",
+    "get_product_details",
+    "get_supplier_info",
+    "create_audit_record",
+})
+
+# Audit record created by the end-to-end workflow test
+WORKFLOW_AUDIT_ARGUMENTS = {
+    "user_id": "alice-001",
+    "action": "workflow_test",
+    "details": {"test": "complete_workflow"},
+    "decision_reasoning": "Integration test workflow via MCP client"
+}
+
+# Endpoint paths served by FastMCP; trailing slashes are stripped before matching
+MCP_ENDPOINT_PATHS = ('/sse', '/mcp')
+# Connections kept open for the whole module, so calls skip the TCP/TLS handshake
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0)
 
 
 def normalize_mcp_url(url: str) -> str:
@@ -19,232 +76,302 @@ def normalize_mcp_url(url: str) -> str:
     url = url.rstrip('/')
     
     # If URL already has an MCP endpoint path, use it as-is with trailing slash
-    if url.endswith('/sse') or url.endswith('/mcp'):
+    if url.endswith(MCP_ENDPOINT_PATHS):
         return url + '/'
     
-    # If URL already has the endpoint with trailing slash, return as-is
-    if url.endswith('/sse/') or url.endswith('/mcp/'):
-        return url
-    
     # If URL doesn't have an endpoint path, assume SSE for Azure Container Apps
     # Check if the URL ends with the domain (no path)
-    from urllib.parse import urlparse
-    parsed = urlparse(url)
-    if not parsed.path or parsed.path == '/':
+    if not urlparse(url).path:
         return url + '/sse/'
     
-    # If there's some other path, add trailing slash if needed
-    return url + '/' if not url.endswith('/') else url
+    # If there's some other path, add a trailing slash
+    return url + '/'
 
 
-class TestRemoteMCPServer:
-    """Test the remote MCP server functionality via official MCP client."""
+def http_client_factory(headers=None, timeout=None, auth=None) -> httpx.AsyncClient:
+    """Create the transport's HTTP client, multiplexing requests over HTTP/2 when h2 is installed.
+    
+    Mirrors the MCP SDK's default client (redirects followed, 30 second timeout)
+    with a larger keep-alive pool.
+    """
+    return httpx.AsyncClient(
+        http2=h2 is not None,
+        limits=HTTP_LIMITS,
+        follow_redirects=True,
+        headers=headers,
+        timeout=timeout or httpx.Timeout(30.0),
+        auth=auth
+    )
+
+
+def _tool_output(result):
+    """Decode the JSON output of a tool call; several content blocks decode to a list."""
+    assert not result.isError, result.content
+    outputs = [json.loads(content.text) for content in result.content]
+    return outputs[0] if len(outputs) == 1 else outputs
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    """Get the remote server URL from environment."""
+    url = os.getenv("MCP_SERVER_ENDPOINT", "https://mcp.ashystone-fba1adc5.swedencentral.azurecontainerapps.io")
+    return normalize_mcp_url(url)
+
+
+@asynccontextmanager
+async def remote_session(server_url: str, timeout: timedelta):
+    """Open an MCP session to a deployed server.
+    
+    URLs ending in /mcp/ use the Streamable HTTP transport, all others SSE.
+    Requests not answered within ``timeout`` fail with an McpError.
+    """
+    # Use the full URL as provided (should include /sse or /mcp endpoint)
+    if server_url.endswith('/mcp/'):
+        transport = streamablehttp_client(server_url, httpx_client_factory=http_client_factory)
+    else:
+        transport = sse_client(server_url, httpx_client_factory=http_client_factory)
+    
+    # Streamable HTTP also yields a session ID getter after the two streams
+    async with transport as (read, write, *_):
+        async with ClientSession(read, write, read_timeout_seconds=timeout) as session:
+            await session.initialize()
+            yield session
+
+
+@asynccontextmanager
+async def local_session(timeout: timedelta):
+    """Open an initialized MCP session to the server running in this process."""
+    import main
+    
+    async with create_connected_server_and_client_session(
+        main.mcp._mcp_server, read_timeout_seconds=timeout
+    ) as session:
+        yield session
+
+
+@pytest.fixture(scope="module")
+def mcp_timeout(request):
+    """Deadline for connecting and for each MCP request, from --mcp-timeout."""
+    return timedelta(seconds=request.config.getoption("--mcp-timeout"))
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def session(run_remote, server_url, mcp_timeout):
+    """MCP client session shared by every test in this module.
+    
+    Connects to the deployed server with --run-remote or when MCP_SERVER_ENDPOINT
+    is set, and to the in-process server otherwise. A server that does not
+    complete the handshake within ``mcp_timeout`` skips the tests, and a tool
+    call that does not return within it fails its test instead of hanging.
+    """
+    open_session = remote_session(server_url, mcp_timeout) if run_remote else local_session(mcp_timeout)
     
-    @pytest.fixture
-    def server_url(self):
-        """Get the remote server URL from environment."""
-        url = os.getenv("MCP_SERVER_ENDPOINT", "https://mcp.ashystone-fba1adc5.swedencentral.azurecontainerapps.io")
-        return normalize_mcp_url(url)
+    opened = asyncio.get_running_loop().create_future()
+    release = asyncio.Event()
     
-    @asynccontextmanager
-    async def mcp_session(self, server_url: str):
-        """Create MCP client session for the remote server using SSE transport."""
+    async def hold_session():
+        # The session must be entered and exited in the same task, while
+        # pytest-asyncio runs fixture setup and teardown in separate ones
         try:
-            # Use the full URL as provided (should include /sse or /mcp endpoint)
-            async with sse_client(server_url) as (read, write):
-                async with ClientSession(read, write) as session:
-                    # Initialize the session
-                    await session.initialize()
-                    yield session
+            async with open_session as session:
+                opened.set_result(session)
+                await release.wait()
         except Exception as e:
-            pytest.skip(f"Could not connect to MCP server at {server_url}: {e}")
+            if opened.done():
+                raise
+            opened.set_exception(e)
     
-    @pytest.mark.asyncio
-    async def test_list_tools_remote(self, server_url):
+    holder = asyncio.create_task(hold_session())
+    try:
+        async with asyncio.timeout(mcp_timeout.total_seconds()):
+            session = await opened
+    except Exception as e:
+        holder.cancel()
+        with suppress(asyncio.CancelledError):
+            await holder
+        target = server_url if run_remote else "the in-process server"
+        pytest.skip(f"Could not connect to MCP server at {target}: {e!r}")
+    
+    yield session
+    
+    release.set()
+    await holder
+
+
+class TestRemoteMCPServer:
+    """Test the remote MCP server functionality via official MCP client."""
+    
+    async def test_list_tools_remote(self, session):
         """Test that we can list tools from the remote MCP server."""
-        async with self.mcp_session(server_url) as session:
-            # List available tools
-            tools_response = await session.list_tools()
-            
-            # Verify expected tools are available
-            expected_tools = [
-                "get_user",
-                "get_department_policy", 
-                "get_department_budget",
-                "search_products",
-                "get_product_details",
-                "get_supplier_info",
-                "create_audit_record"
-            ]
-            
-            available_tools = [tool.name for tool in tools_response.tools]
-            
-            for expected_tool in expected_tools:
-                assert expected_tool in available_tools, f"Tool {expected_tool} not found in remote server"
-            
-            print(f"✅ Found {len(available_tools)} tools: {available_tools}")
+        # List available tools
+        tools_response = await session.list_tools()
+        
+        available_tools = [tool.name for tool in tools_response.tools]
+        
+        # Verify expected tools are available, reporting every missing one at once
+        missing_tools = EXPECTED_TOOLS.difference(available_tools)
+        assert not missing_tools, f"Tools not found in remote server: {sorted(missing_tools)}"
+        
+        logger.info("✅ Found %s tools: %s", len(available_tools), available_tools)
     
-    @pytest.mark.asyncio
-    async def test_get_user_remote(self, server_url):
+    async def test_get_user_remote(self, session):
         """Test user retrieval via remote MCP."""
-        async with self.mcp_session(server_url) as session:
-            # Call the get_user tool
-            result = await session.call_tool("get_user", {"user_id": "alice-001"})
-            
-            # Verify response structure
-            assert result.content is not None
-            content_text = str(result.content[0].text) if result.content else ""
-            
-            # Verify user data
-            assert "Alice Johnson" in content_text
-            assert "IT" in content_text
-            print(f"✅ User lookup successful: {content_text[:100]}...")
+        # Call the get_user tool
+        result = await session.call_tool("get_user", {"user_id": "alice-001"})
+        
+        # Verify response structure
+        assert result.content is not None
+        content_text = str(result.content[0].text) if result.content else ""
+        
+        # Verify user data
+        assert "Alice Johnson" in content_text
+        assert "IT" in content_text
+        logger.info("✅ User lookup successful: %s...", content_text[:100])
     
-    @pytest.mark.asyncio 
-    async def test_get_user_not_found_remote(self, server_url):
+    async def test_get_user_not_found_remote(self, session):
         """Test user not found scenario via remote MCP."""
-        async with self.mcp_session(server_url) as session:
-            result = await session.call_tool("get_user", {"user_id": "nonexistent"})
-            
-            content_text = str(result.content[0].text) if result.content else ""
-            assert "not found" in content_text.lower() or "none" in content_text.lower()
-            print(f"✅ User not found handling: {content_text}")
+        result = await session.call_tool("get_user", {"user_id": "nonexistent"})
+        
+        content_text = str(result.content[0].text) if result.content else ""
+        assert _NOT_FOUND_RE.search(content_text)
+        logger.info("✅ User not found handling: %s", content_text)
     
-    @pytest.mark.asyncio
-    async def test_search_products_remote(self, server_url):
+    async def test_search_products_remote(self, session):
         """Test product search via remote MCP."""
-        async with self.mcp_session(server_url) as session:
-            # Test exact match
-            result = await session.call_tool("search_products", {"name": "Business Laptop"})
-            content_text = str(result.content[0].text) if result.content else ""
-            assert "Business Laptop" in content_text
-            
-            # Test equivalent product scenario
-            result = await session.call_tool("search_products", {"name": "computer"})
-            content_text = str(result.content[0].text) if result.content else ""
-            assert len(content_text) > 0  # Should find something
-            print("✅ Product search successful")
-            
-    @pytest.mark.asyncio
-    async def test_get_product_details_remote(self, server_url):
+        # Test exact match
+        result = await session.call_tool("search_products", {"name": "Business Laptop"})
+        content_text = str(result.content[0].text) if result.content else ""
+        assert "Business Laptop" in content_text
+        
+        # Test equivalent product scenario
+        result = await session.call_tool("search_products", {"name": "computer"})
+        content_text = str(result.content[0].text) if result.content else ""
+        assert len(content_text) > 0  # Should find something
+        logger.info("✅ Product search successful")
+        
+    async def test_get_product_details_remote(self, session):
         """Test product details retrieval via remote MCP."""
-        async with self.mcp_session(server_url) as session:
-            result = await session.call_tool("get_product_details", {"product_id": "LAPTOP-001"})
-            
-            content_text = str(result.content[0].text) if result.content else ""
-            assert "LAPTOP-001" in content_text
-            assert "supplier" in content_text.lower() or "price" in content_text.lower()
-            print("✅ Product details retrieval successful")
+        result = await session.call_tool("get_product_details", {"product_id": "LAPTOP-001"})
+        
+        content_text = str(result.content[0].text) if result.content else ""
+        assert "LAPTOP-001" in content_text
+        assert _DETAILS_RE.search(content_text)
+        logger.info("✅ Product details retrieval successful")
     
-    @pytest.mark.asyncio
-    async def test_get_department_policy_remote(self, server_url):
+    async def test_get_department_policy_remote(self, session):
         """Test department policy retrieval via remote MCP."""
-        async with self.mcp_session(server_url) as session:
-            result = await session.call_tool("get_department_policy", {"department_id": "IT"})
-            
-            content_text = str(result.content[0].text) if result.content else ""
-            assert "Information Technology" in content_text or "IT" in content_text
-            assert "electronics" in content_text.lower()
-            print("✅ Department policy retrieval successful")
+        result = await session.call_tool("get_department_policy", {"department_id": "IT"})
+        
+        content_text = str(result.content[0].text) if result.content else ""
+        assert "Information Technology" in content_text or "IT" in content_text
+        assert _ELECTRONICS_RE.search(content_text)
+        logger.info("✅ Department policy retrieval successful")
     
-    @pytest.mark.asyncio
-    async def test_get_department_budget_remote(self, server_url):
+    async def test_get_department_budget_remote(self, session):
         """Test department budget retrieval via remote MCP."""
-        async with self.mcp_session(server_url) as session:
-            result = await session.call_tool("get_department_budget", {"department_id": "IT"})
-            
-            content_text = str(result.content[0].text) if result.content else ""
-            assert "budget" in content_text.lower()
-            assert any(char.isdigit() for char in content_text)  # Should contain budget numbers
-            print("✅ Department budget retrieval successful")
+        result = await session.call_tool("get_department_budget", {"department_id": "IT"})
+        
+        content_text = str(result.content[0].text) if result.content else ""
+        assert _BUDGET_RE.search(content_text)  # Should contain budget numbers
+        logger.info("✅ Department budget retrieval successful")
     
-    @pytest.mark.asyncio
-    async def test_create_audit_record_remote(self, server_url):
+    async def test_create_audit_record_remote(self, session):
         """Test audit record creation via remote MCP."""
-        async with self.mcp_session(server_url) as session:
-            result = await session.call_tool("create_audit_record", {
-                "user_id": "alice-001",
-                "action": "purchase_approved",
-                "details": {"product": "LAPTOP-001", "supplier": "tech-supplier-01"},
-                "decision_reasoning": "Remote MCP test audit record"
-            })
-            
-            content_text = str(result.content[0].text) if result.content else ""
-            assert "audit" in content_text.lower() or "record" in content_text.lower()
-            print("✅ Audit record creation successful")
+        result = await session.call_tool("create_audit_record", {
+            "user_id": "alice-001",
+            "action": "purchase_approved",
+            "details": {"product": "LAPTOP-001", "supplier": "tech-supplier-01"},
+            "decision_reasoning": "Remote MCP test audit record"
+        })
+        
+        content_text = str(result.content[0].text) if result.content else ""
+        assert _AUDIT_RE.search(content_text)
+        logger.info("✅ Audit record creation successful")
 
 
 class TestRemoteMCPIntegration:
     """Test complete business scenarios via remote MCP server."""
     
-    @pytest.fixture
-    def server_url(self):
-        """Get the remote server URL from environment."""
-        url = os.getenv("MCP_SERVER_ENDPOINT", "https://mcp.ashystone-fba1adc5.swedencentral.azurecontainerapps.io")
-        return normalize_mcp_url(url)
+    async def test_complete_purchase_workflow_remote(self, session):
+        """Test a complete purchase workflow via remote MCP."""
+        logger.info("🔄 Testing complete purchase workflow...")
+        
+        tools_response = await session.list_tools()
+        if "batch_execute" in {tool.name for tool in tools_response.tools}:
+            user, policy, budget, products, details, supplier, audit = await self._run_workflow_batched(session)
+        else:
+            user, policy, budget, products, details, supplier, audit = await self._run_workflow_individually(session)
+        
+        assert policy["department_id"] == user["department_id"]
+        assert budget["remaining_budget"] > 0
+        logger.info("  ✅ User context (user, policy, budget) retrieved")
+        
+        assert products
+        logger.info("  ✅ Product search completed")
+        
+        assert "LAPTOP-001" in json.dumps(details)
+        logger.info("  ✅ Product details retrieved")
+        
+        assert supplier["supplier_id"] == "TECHCORP-001"
+        logger.info("  ✅ Supplier information retrieved")
+        
+        assert audit["user_id"] == "alice-001"
+        logger.info("  ✅ Audit record created")
+        
+        logger.info("🎉 Complete workflow test successful!")
     
-    @asynccontextmanager
-    async def mcp_session(self, server_url: str):
-        """Create MCP client session for the remote server using SSE transport."""
-        try:
-            async with sse_client(server_url) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    yield session
-        except Exception as e:
-            pytest.skip(f"Could not connect to MCP server at {server_url}: {e}")
+    async def _run_workflow_batched(self, session):
+        """Run the workflow as one batch_execute call and return each step's output."""
+        # None of the steps depend on each other's results, so the whole workflow
+        # is sent as one batch in a single round-trip
+        batch_result = await session.call_tool("batch_execute", {
+            "calls": [
+                # 1-3. Get user info, department policy and budget in one call
+                {"tool": "get_user_context", "arguments": {"user_id": "alice-001"}},
+                # 4. Search for products
+                {"tool": "search_products", "arguments": {"name": "laptop"}},
+                # 5. Get product details
+                {"tool": "get_product_details", "arguments": {"product_id": "LAPTOP-001"}},
+                # 6. Get supplier information
+                {"tool": "get_supplier_info", "arguments": {"supplier_id": "TECHCORP-001"}},
+                # 7. Create audit record
+                {"tool": "create_audit_record", "arguments": WORKFLOW_AUDIT_ARGUMENTS},
+            ],
+            "max_concurrent": 5
+        })
+        assert batch_result.content is not None
+        steps = json.loads(batch_result.content[0].text)
+        assert [step["tool"] for step in steps] == [
+            "get_user_context", "search_products", "get_product_details", "get_supplier_info", "create_audit_record"
+        ]
+        assert not [step for step in steps if "error" in step]
+        context, products, details, supplier, audit = (step["result"] for step in steps)
+        return context["user"], context["department"], context["budget"], products, details, supplier, audit
     
-    @pytest.mark.asyncio
-    async def test_complete_purchase_workflow_remote(self, server_url):
-        """Test a complete purchase workflow via remote MCP."""
-        async with self.mcp_session(server_url) as session:
-            print("🔄 Testing complete purchase workflow...")
-            
+    async def _run_workflow_individually(self, session):
+        """Run the workflow with one call per step, for servers without batch_execute."""
+        # Steps 1-6 do not depend on each other, so they are sent concurrently
+        results = await asyncio.gather(
             # 1. Get user info
-            user_result = await session.call_tool("get_user", {"user_id": "alice-001"})
-            assert user_result.content is not None
-            print("  ✅ User lookup completed")
-            
-            # 2. Get department policy
-            policy_result = await session.call_tool("get_department_policy", {"department_id": "IT"})
-            assert policy_result.content is not None
-            print("  ✅ Department policy retrieved")
-            
-            # 3. Check budget
-            budget_result = await session.call_tool("get_department_budget", {"department_id": "IT"})
-            assert budget_result.content is not None
-            print("  ✅ Budget status checked")
-            
+            session.call_tool("get_user", {"user_id": "alice-001"}),
+            # 2-3. Get department policy and budget
+            session.call_tool("get_department_policy", {"department_id": "IT"}),
+            session.call_tool("get_department_budget", {"department_id": "IT"}),
             # 4. Search for products
-            search_result = await session.call_tool("search_products", {"name": "laptop"})
-            assert search_result.content is not None
-            print("  ✅ Product search completed")
-            
+            session.call_tool("search_products", {"name": "laptop"}),
             # 5. Get product details
-            details_result = await session.call_tool("get_product_details", {"product_id": "LAPTOP-001"})
-            assert details_result.content is not None
-            print("  ✅ Product details retrieved")
-            
+            session.call_tool("get_product_details", {"product_id": "LAPTOP-001"}),
             # 6. Get supplier information
-            supplier_result = await session.call_tool("get_supplier_info", {"supplier_id": "TECHCORP-001"})
-            assert supplier_result.content is not None
-            print("  ✅ Supplier information retrieved")
-            
-            # 7. Create audit record
-            audit_result = await session.call_tool("create_audit_record", {
-                "user_id": "alice-001",
-                "action": "workflow_test",
-                "details": {"test": "complete_workflow"},
-                "decision_reasoning": "Integration test workflow via MCP client"
-            })
-            assert audit_result.content is not None
-            print("  ✅ Audit record created")
-            
-            print("🎉 Complete workflow test successful!")
+            session.call_tool("get_supplier_info", {"supplier_id": "TECHCORP-001"}),
+        )
+        # 7. Create audit record
+        audit_result = await session.call_tool("create_audit_record", WORKFLOW_AUDIT_ARGUMENTS)
+        return [_tool_output(result) for result in (*results, audit_result)]
 
 
 if __name__ == "__main__":
     # Run with environment variable: MCP_SERVER_ENDPOINT=https://your-deployed-server.com
+    # (without it the tests run against the in-process server)
     print("Remote MCP Server Tests (Official MCP Client)")
     print("=" * 50)
     print("Set MCP_SERVER_ENDPOINT environment variable to your deployed server URL")
@@ -256,4 +383,4 @@ if __name__ == "__main__":
     print("  $env:MCP_SERVER_ENDPOINT='https://mcp.your-domain.azurecontainerapps.io/sse/'")
     print()
     
-    pytest.main([__file__, "-v", "-s"])
+    pytest.main([__file__, "-v", "-s", "--log-cli-level=INFO"])